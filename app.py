@@ -1,18 +1,112 @@
-import json
+import hashlib
+import heapq
 import os
+import queue
 import re
+import stat
 import subprocess
+import threading
 import time
+import urllib.parse
 import urllib.request
 import urllib.error
+from concurrent.futures import ThreadPoolExecutor, wait
+from itertools import islice
+from pathlib import Path
 from datetime import datetime, timezone
 import markdown
-from flask import Flask, render_template, request, jsonify
+import orjson
+import requests
+from requests.adapters import HTTPAdapter
+from flask import Flask, g, render_template, request, jsonify, send_file
+from flask.json.provider import JSONProvider
 from config import Config, TestConfig
 
+# Valid agent/tmux session names for the terminal endpoint
+_AGENT_NAME_RE = re.compile(r'\A[A-Za-z0-9_-]+\Z')
+
+# Most tmux sessions /api/agents/terminals captures in one request
+MAX_TERMINAL_NAMES = 32
+
+# Channel ID -> team member name for CC-Bridge relay messages
+_CHANNEL_AGENT_MAP = {
+    "C0ACEGVT7CL": "Mat",   # #mat-pm
+    "C0AC7G548CV": "Kat",   # #kat-dev
+    "C0ABVFJPM9D": "Sam",   # #sam-dev
+}
+
+# Patterns that identify the sender in message text (checked in order)
+_AGENT_SIGNATURE_RE = re.compile(
+    r"\b"                             # name starts a word
+    r"(Mat|Kat|Sam|Dan)"              # agent name
+    r"(?:"
+    r"\s+here\b"                      # "Sam here"
+    r"|:"                             # "Kat:"
+    r"|\s*\u2014"                     # "Sam —" (em dash)
+    r"|\s*--"                         # "Sam --"
+    r"|\s+\(via\s+Claude\.ai\)"       # "Dan (via Claude.ai)"
+    r")"
+)
+
+# One Markdown instance reused across renders; it keeps per-document
+# state, so conversions are serialized and reset() between documents
+_markdown = markdown.Markdown()
+_markdown_lock = threading.Lock()
+
+
+def _render_markdown(text):
+    """Render markdown text to HTML with the shared converter."""
+    with _markdown_lock:
+        return _markdown.reset().convert(text)
+
+
+# Upper bound on how long /api/activity waits for its outbound fetches
+ACTIVITY_FETCH_DEADLINE = 6
+
+# Shared by every app instance for outbound I/O fan-out (Slack, git)
+_io_executor = ThreadPoolExecutor(max_workers=8,
+                                  thread_name_prefix="dashboard-io")
+
+# Upper bound on how long /api/issues waits for the per-repo fetches
+GITHUB_FETCH_DEADLINE = 15
+
+# GitHub gets its own small pool so a long repo list can't queue ahead of
+# the activity feed's git/Slack fetches on _io_executor
+_github_executor = ThreadPoolExecutor(max_workers=4,
+                                      thread_name_prefix="dashboard-github")
+
+# Keep-alive session for Slack API calls so the TLS connection to
+# slack.com is reused instead of re-handshaking on every request
+_slack_http = requests.Session()
+_slack_http.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+
+
+class OrjsonProvider(JSONProvider):
+    """Flask JSON provider backed by orjson.
+
+    Routes jsonify() and request.get_json() through orjson instead of the
+    stdlib json module; responses are written as bytes without a str
+    round trip. Non-str dict keys are stringified, as the default
+    provider does.
+    """
+
+    option = orjson.OPT_NON_STR_KEYS
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, option=self.option).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj, option=self.option),
+                                        mimetype="application/json")
+
 
 def create_app(testing=False, db_path_override=None):
     app = Flask(__name__)
+    app.json = OrjsonProvider(app)
 
     if testing:
         app.config.from_object(TestConfig)
@@ -22,66 +116,202 @@ def create_app(testing=False, db_path_override=None):
     if db_path_override:
         app.config["DATABASE_PATH"] = db_path_override
 
+    # Resolve ~ in configured paths once instead of on every request
+    for key in ("AGENTS_BASE_PATH", "HEARTBEAT_FILE", "DISPATCH_FILE",
+                "PROJECT_DIR"):
+        app.config[key] = os.path.expanduser(app.config[key])
+
     # Ensure instance folder exists
     os.makedirs(os.path.join(app.root_path, "instance"), exist_ok=True)
 
-    # Slack user ID -> display name cache
-    _slack_user_cache = {}
-
     # Issues cache: {"data": [...], "timestamp": float}
     _issues_cache = {"data": None, "timestamp": 0}
 
-    def resolve_slack_user(user_id, token, fallback_name=""):
-        """Resolve a Slack user ID to a display name via users.info API.
-
-        Results are cached in _slack_user_cache. Falls back to
-        fallback_name (e.g. bot_profile.name) or the raw user_id.
+    # git log events for the last seen HEAD: {"key": (project_dir, sha), ...}
+    _git_log_cache = {"key": None, "events": None}
+
+    # Last time the offline sweep ran (monotonic), see api_list_agents
+    _timeout_check = {"last": None}
+
+    # Serialized /api/agents payload: {"body": bytes, "timestamp": monotonic}.
+    # generation counts writes, as for the activity cache below
+    _agents_cache = {"body": None, "timestamp": 0, "generation": 0}
+    _agents_lock = threading.Lock()
+
+    # Heartbeat/dispatch state files: {path: ((st_mtime_ns, st_size), state)}
+    _state_file_cache = {}
+
+    # tmux capture cache: {session name: (monotonic time, payload, status)}
+    _terminal_cache = {}
+
+    # WORKING.md cache: {path: ((st_mtime_ns, st_size), content, content_html)}
+    _working_cache = {}
+
+    # Activity cache: serialized /api/activity payload plus its ETag.
+    # generation counts invalidations so a recompute that raced a write
+    # doesn't store its already-stale result
+    _activity_cache = {"key": None, "body": None, "etag": None, "timestamp": 0,
+                       "generation": 0}
+    _activity_lock = threading.Lock()
+
+    # Git/Slack events kept fresh by the background poller
+    _external_events = {"key": None, "sources": None, "complete": False,
+                        "timestamp": 0}
+    _activity_poller = {"started": False}
+
+    # Serializes recomputation so concurrent misses share one fetch
+    _activity_refresh_lock = threading.Lock()
+
+    # Wake-up queues for /api/activity/stream subscribers
+    _activity_subscribers = set()
+
+    def reset_caches():
+        """Drop every in-process cache, e.g. between tests sharing one app."""
+        _issues_cache.update(data=None, timestamp=0)
+        _git_log_cache.update(key=None, events=None)
+        _timeout_check["last"] = None
+        invalidate_agents_cache()
+        _state_file_cache.clear()
+        _terminal_cache.clear()
+        _working_cache.clear()
+        with _activity_lock:
+            _activity_cache.update(key=None, body=None, etag=None,
+                                   timestamp=0)
+            _external_events.update(key=None, sources=None, complete=False,
+                                    timestamp=0)
+
+    app.extensions["reset_caches"] = reset_caches
+
+    def invalidate_agents_cache():
+        """Drop the cached /api/agents body after an agent write."""
+        with _agents_lock:
+            _agents_cache["body"] = None
+            _agents_cache["generation"] += 1
+
+    def invalidate_activity_cache():
+        """Drop the cached activity payload and wake stream subscribers."""
+        with _activity_lock:
+            _activity_cache["body"] = None
+            _activity_cache["generation"] += 1
+            subscribers = list(_activity_subscribers)
+        for wakeup in subscribers:
+            try:
+                wakeup.put_nowait(None)
+            except queue.Full:
+                pass
+
+    def _slack_display_name(user, user_id):
+        """Pick the best display name from a Slack user object."""
+        profile = user.get("profile", {})
+        return (profile.get("display_name")
+                or user.get("real_name")
+                or user_id)
+
+    def fetch_slack_user_name(user_id, token):
+        """Look up a Slack user's display name via the users.info API.
+
+        Returns None when the lookup fails (network error, missing scope,
+        user_not_found) so the caller can fall back and negative-cache.
         """
-
-        if user_id in _slack_user_cache:
-            return _slack_user_cache[user_id]
-
         try:
-            url = f"https://slack.com/api/users.info?user={user_id}"
-            req = urllib.request.Request(url, headers={
-                "Authorization": f"Bearer {token}",
-                "Content-Type": "application/json"
-            })
-            with urllib.request.urlopen(req, timeout=5) as resp:
-                data = json.loads(resp.read().decode())
+            resp = _slack_http.get(
+                f"https://slack.com/api/users.info?user={user_id}",
+                headers={"Authorization": f"Bearer {token}"},
+                timeout=5,
+            )
+            data = orjson.loads(resp.content)
             if data.get("ok"):
-                profile = data["user"].get("profile", {})
-                name = (profile.get("display_name")
-                        or data["user"].get("real_name")
-                        or user_id)
-                _slack_user_cache[user_id] = name
-                return name
-        except (urllib.error.URLError, OSError, ValueError, KeyError):
+                return _slack_display_name(data["user"], user_id)
+        except (requests.RequestException, ValueError, KeyError):
             pass
+        return None
 
-        resolved = fallback_name or user_id
-        _slack_user_cache[user_id] = resolved
-        return resolved
+    def fetch_slack_user_directory(token, deadline):
+        """Fetch the workspace member list via users.list.
 
-    # Channel ID -> team member name for CC-Bridge relay messages
-    _channel_agent_map = {
-        "C0ACEGVT7CL": "Mat",   # #mat-pm
-        "C0AC7G548CV": "Kat",   # #kat-dev
-        "C0ABVFJPM9D": "Sam",   # #sam-dev
-    }
+        Follows response_metadata.next_cursor until the last page or the
+        deadline. Returns {user_id: display name} for every page fetched;
+        a failed page ends the walk with what was collected so far.
+        """
+        directory = {}
+        cursor = ""
+        while True:
+            url = "https://slack.com/api/users.list?limit=200"
+            if cursor:
+                url += "&cursor=" + urllib.parse.quote(cursor, safe="")
+            try:
+                resp = _slack_http.get(
+                    url,
+                    headers={"Authorization": f"Bearer {token}"},
+                    timeout=max(0.1, min(5, deadline - time.monotonic())),
+                )
+                data = orjson.loads(resp.content)
+                if not data.get("ok"):
+                    break
+                for member in data.get("members", []):
+                    directory[member["id"]] = _slack_display_name(
+                        member, member["id"])
+            except (requests.RequestException, ValueError, KeyError):
+                break
+            cursor = (data.get("response_metadata") or {}).get(
+                "next_cursor", "")
+            if not cursor or time.monotonic() >= deadline:
+                break
+        return directory
+
+    def resolve_slack_users(conn, fallbacks, token, deadline):
+        """Resolve Slack user IDs to display names, using the DB cache.
+
+        fallbacks maps user_id -> fallback name (e.g. bot_profile.name).
+        Cache misses trigger a users.list walk that refreshes the whole
+        directory; IDs it doesn't cover are looked up individually
+        via users.info, concurrently, until deadline. Successful lookups
+        are cached for SLACK_USER_CACHE_TTL, failed ones store the
+        fallback (or raw ID) for the shorter SLACK_USER_NEGATIVE_TTL.
+        """
+        from models import (get_cached_slack_user, cache_slack_user,
+                            cache_slack_users)
+
+        ttl = app.config.get("SLACK_USER_CACHE_TTL", 86400)
+        names = {}
+        misses = []
+        for user_id in fallbacks:
+            cached = get_cached_slack_user(conn, user_id)
+            if cached is not None:
+                names[user_id] = cached
+            else:
+                misses.append(user_id)
+        if not misses:
+            return names
+
+        directory = fetch_slack_user_directory(token, deadline)
+        if directory:
+            cache_slack_users(conn, directory.items(), ttl)
+
+        pending = {}
+        for user_id in misses:
+            if user_id in directory:
+                names[user_id] = directory[user_id]
+            else:
+                pending[user_id] = _io_executor.submit(
+                    fetch_slack_user_name, user_id, token
+                )
 
-    # Patterns that identify the sender in message text (checked in order)
-    _agent_signature_re = re.compile(
-        r"(?:^|\W)"                       # start of string or non-word char
-        r"(Mat|Kat|Sam|Dan)"              # agent name
-        r"(?:"
-        r"\s+here\b"                      # "Sam here"
-        r"|:"                             # "Kat:"
-        r"|\s*\u2014"                     # "Sam —" (em dash)
-        r"|\s*--"                         # "Sam --"
-        r"|\s+\(via\s+Claude\.ai\)"       # "Dan (via Claude.ai)"
-        r")"
-    )
+        wait(pending.values(), timeout=max(0, deadline - time.monotonic()))
+        for user_id, future in pending.items():
+            if not future.done():
+                names[user_id] = fallbacks[user_id] or user_id
+                continue
+            name = future.result()
+            if name is not None:
+                cache_slack_user(conn, user_id, name, ttl)
+            else:
+                name = fallbacks[user_id] or user_id
+                cache_slack_user(conn, user_id, name, app.config.get(
+                    "SLACK_USER_NEGATIVE_TTL", 300
+                ))
+            names[user_id] = name
+        return names
 
     def _infer_agent_name(display_name, channel_id, text):
         """Infer team member name from CC-Bridge relay messages.
@@ -93,22 +323,40 @@ def create_app(testing=False, db_path_override=None):
             return display_name
 
         # 1. Text signatures win — the message tells us who sent it
-        m = _agent_signature_re.search(text)
+        m = _AGENT_SIGNATURE_RE.search(text)
         if m:
             return m.group(1)
 
         # 2. Channel-based fallback
-        if channel_id in _channel_agent_map:
-            return _channel_agent_map[channel_id]
+        if channel_id in _CHANNEL_AGENT_MAP:
+            return _CHANNEL_AGENT_MAP[channel_id]
 
         return "CC-Bridge"
 
-    from models import init_db, get_db_connection
+    from models import init_db, ConnectionPool
+
+    # Shared connection pool; each request checks one out via get_conn()
+    pool = ConnectionPool(
+        app.config["DATABASE_PATH"],
+        size=app.config.get("DATABASE_POOL_SIZE", 5),
+    )
+    app.extensions["db_pool"] = pool
 
     # Initialize database
-    db_conn = get_db_connection(app.config["DATABASE_PATH"])
-    init_db(db_conn)
-    db_conn.close()
+    with pool.borrow() as db_conn:
+        init_db(db_conn)
+
+    def get_conn():
+        """Return this request's pooled connection, checking one out lazily."""
+        if "db_conn" not in g:
+            g.db_conn = pool.get()
+        return g.db_conn
+
+    @app.teardown_appcontext
+    def _return_conn(exc):
+        conn = g.pop("db_conn", None)
+        if conn is not None:
+            pool.put(conn)
 
     # --- Template routes ---
 
@@ -117,7 +365,10 @@ def create_app(testing=False, db_path_override=None):
         admin_key = request.args.get("admin", "")
         configured_key = app.config.get("DASHBOARD_API_KEY", "")
         is_admin = bool(configured_key and admin_key == configured_key)
-        return render_template("dashboard.html", is_admin=is_admin)
+        return render_template(
+            "dashboard.html", is_admin=is_admin,
+            activity_stream=app.config.get("ACTIVITY_STREAM_ENABLED", False),
+        )
 
     @app.route("/agents")
     def agents():
@@ -141,17 +392,16 @@ def create_app(testing=False, db_path_override=None):
         role = data.get("role", "")
         status = data.get("status", "online")
 
-        conn = get_db_connection(app.config["DATABASE_PATH"])
-        try:
-            existing = conn.execute(
-                "SELECT id FROM agents WHERE name = ?", (name,)
-            ).fetchone()
+        conn = get_conn()
+        existing = conn.execute(
+            "SELECT id FROM agents WHERE name = ?", (name,)
+        ).fetchone()
 
-            agent = create_agent(conn, name, role=role, status=status)
-            status_code = 200 if existing else 201
-            return jsonify(agent), status_code
-        finally:
-            conn.close()
+        agent = create_agent(conn, name, role=role, status=status)
+        invalidate_agents_cache()
+        invalidate_activity_cache()
+        status_code = 200 if existing else 201
+        return jsonify(agent), status_code
 
     @app.route("/api/agents/<int:agent_id>/heartbeat", methods=["POST"])
     def api_heartbeat(agent_id):
@@ -161,42 +411,49 @@ def create_app(testing=False, db_path_override=None):
         status = data.get("status")
         current_task = data.get("current_task")
 
-        conn = get_db_connection(app.config["DATABASE_PATH"])
-        try:
-            agent = update_heartbeat(conn, agent_id, status=status,
-                                     current_task=current_task)
-            if agent is None:
-                return jsonify({"error": "agent not found"}), 404
-            return jsonify(agent), 200
-        finally:
-            conn.close()
+        agent = update_heartbeat(get_conn(), agent_id, status=status,
+                                 current_task=current_task)
+        if agent is None:
+            return jsonify({"error": "agent not found"}), 404
+        invalidate_agents_cache()
+        invalidate_activity_cache()
+        return jsonify(agent), 200
 
     @app.route("/api/agents/<int:agent_id>/working", methods=["GET"])
     def api_working(agent_id):
         from models import get_agent
 
-        conn = get_db_connection(app.config["DATABASE_PATH"])
-        try:
-            agent = get_agent(conn, agent_id)
-            if agent is None:
-                return jsonify({"error": "agent not found"}), 404
-        finally:
-            conn.close()
-
-        agents_base = app.config.get(
-            "AGENTS_BASE_PATH",
-            os.path.expanduser("~/agents")
-        )
+        agent = get_agent(get_conn(), agent_id)
+        if agent is None:
+            return jsonify({"error": "agent not found"}), 404
+
+        agents_base = app.config["AGENTS_BASE_PATH"]
         name_lower = agent["name"].lower()
         working_path = os.path.join(agents_base, name_lower, "WORKING.md")
 
-        if not os.path.isfile(working_path):
+        try:
+            st = os.stat(working_path)
+        except OSError:
+            st = None
+        if st is None or not stat.S_ISREG(st.st_mode):
             return jsonify({"error": "WORKING.md not found"}), 404
 
-        with open(working_path, "r") as f:
-            content = f.read()
-
-        content_html = markdown.markdown(content)
+        # Raw markdown goes out straight from the file, with ETag/304 support
+        best = request.accept_mimetypes.best_match(
+            ["application/json", "text/markdown"])
+        if best == "text/markdown":
+            return send_file(working_path, mimetype="text/markdown",
+                             conditional=True)
+
+        # Re-read and re-render only when the file changed since last poll
+        stamp = (st.st_mtime_ns, st.st_size)
+        cached = _working_cache.get(working_path)
+        if cached is not None and cached[0] == stamp:
+            content, content_html = cached[1], cached[2]
+        else:
+            content = Path(working_path).read_text()
+            content_html = _render_markdown(content)
+            _working_cache[working_path] = (stamp, content, content_html)
 
         return jsonify({
             "agent_name": agent["name"],
@@ -204,10 +461,17 @@ def create_app(testing=False, db_path_override=None):
             "content_html": content_html,
         }), 200
 
-    @app.route("/api/agents/<name>/terminal", methods=["GET"])
-    def api_agent_terminal(name):
-        if not re.fullmatch(r'[A-Za-z0-9_-]+', name):
-            return jsonify({"error": "invalid agent name"}), 400
+    def _capture_terminal(name):
+        """Capture the last 30 lines of a tmux session as (payload, status).
+
+        Results are cached per session for TERMINAL_CACHE_TTL seconds so
+        several dashboards polling the same pane share one tmux fork.
+        """
+        ttl = app.config.get("TERMINAL_CACHE_TTL", 1.0)
+        now = time.monotonic()
+        cached = _terminal_cache.get(name)
+        if cached is not None and now - cached[0] < ttl:
+            return cached[1], cached[2]
 
         try:
             result = subprocess.run(
@@ -215,43 +479,115 @@ def create_app(testing=False, db_path_override=None):
                 capture_output=True, text=True, timeout=5
             )
         except FileNotFoundError:
-            return jsonify({"error": "tmux is not installed"}), 500
+            return {"error": "tmux is not installed"}, 500
         except subprocess.TimeoutExpired:
-            return jsonify({"error": "tmux command timed out"}), 500
+            return {"error": "tmux command timed out"}, 500
 
         if result.returncode != 0:
-            return jsonify({"error": "tmux session not found",
-                            "detail": result.stderr.strip()}), 404
+            payload, status = {"error": "tmux session not found",
+                               "detail": result.stderr.strip()}, 404
+        else:
+            payload, status = {"name": name, "output": result.stdout}, 200
+        if len(_terminal_cache) >= 64:
+            _terminal_cache.clear()
+        _terminal_cache[name] = (now, payload, status)
+        return payload, status
 
-        return jsonify({"name": name, "output": result.stdout}), 200
+    @app.route("/api/agents/<name>/terminal", methods=["GET"])
+    def api_agent_terminal(name):
+        if not _AGENT_NAME_RE.match(name):
+            return jsonify({"error": "invalid agent name"}), 400
+
+        payload, status = _capture_terminal(name)
+        return jsonify(payload), status
+
+    @app.route("/api/agents/terminals", methods=["GET"])
+    def api_agent_terminals():
+        """Capture several tmux sessions at once: ?names=sam,kat."""
+        names = list(dict.fromkeys(
+            n for n in request.args.get("names", "").split(",") if n))
+        if not names:
+            return jsonify({"error": "names is required"}), 400
+        if len(names) > MAX_TERMINAL_NAMES:
+            return jsonify({"error": f"at most {MAX_TERMINAL_NAMES} names"}), 400
+
+        terminals = {}
+        futures = {}
+        for n in names:
+            if _AGENT_NAME_RE.match(n):
+                futures[n] = _io_executor.submit(_capture_terminal, n)
+            else:
+                terminals[n] = {"name": n, "error": "invalid agent name",
+                                "status": 400}
+        for n, future in futures.items():
+            payload, status = future.result()
+            terminals[n] = dict(payload, name=n, status=status)
+        return jsonify(terminals), 200
 
     @app.route("/api/agents", methods=["GET"])
     def api_list_agents():
         from models import get_all_agents, check_heartbeat_timeouts
 
         timeout = app.config.get("AGENT_HEARTBEAT_TIMEOUT", 60)
-        conn = get_db_connection(app.config["DATABASE_PATH"])
-        try:
+        conn = get_conn()
+        # The sweep only needs to run a couple of times per timeout window,
+        # not on every dashboard poll
+        now = time.monotonic()
+        last = _timeout_check["last"]
+        if last is None or now - last >= timeout / 2:
+            _timeout_check["last"] = now
             check_heartbeat_timeouts(conn, timeout_seconds=timeout)
-            agents = get_all_agents(conn)
-            return jsonify(agents), 200
-        finally:
-            conn.close()
+        else:
+            with _agents_lock:
+                cached = dict(_agents_cache)
+            # Nothing was written since the last list; register and
+            # heartbeat drop the cached body
+            if (cached["body"] is not None and now - cached["timestamp"]
+                    < app.config.get("AGENTS_CACHE_TTL", 2)):
+                return app.response_class(cached["body"],
+                                          mimetype="application/json")
+        with _agents_lock:
+            generation = _agents_cache["generation"]
+        body = orjson.dumps(get_all_agents(conn))
+        with _agents_lock:
+            # Skip the store if a write landed after the rows were read
+            if _agents_cache["generation"] == generation:
+                _agents_cache.update(body=body, timestamp=now)
+        return app.response_class(body, mimetype="application/json")
 
     # --- Heartbeat toggle ---
 
-    @app.route("/api/heartbeat/status", methods=["GET"])
-    def api_heartbeat_status():
-        hb_file = app.config.get(
-            "HEARTBEAT_FILE",
-            os.path.expanduser("~/agents/shared/.heartbeat-active")
-        )
+    def _read_state_file(path):
+        """Return the lowercased contents of an on/off state file, or None.
+
+        Polls hit this constantly, so the state is cached by the file's
+        (st_mtime_ns, st_size) and only re-read when either changes.
+        """
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        stamp = (st.st_mtime_ns, st.st_size)
+        cached = _state_file_cache.get(path)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
         try:
-            with open(hb_file, "r") as f:
-                state = f.read().strip().lower()
-            return jsonify({"active": state == "on"}), 200
+            state = Path(path).read_text().strip().lower()
         except FileNotFoundError:
-            return jsonify({"active": False}), 200
+            return None
+        _state_file_cache[path] = (stamp, state)
+        return state
+
+    def _write_state_file(path, state):
+        """Write an on/off state file and record it in the read cache."""
+        Path(path).write_text(state + "\n")
+        st = os.stat(path)
+        _state_file_cache[path] = ((st.st_mtime_ns, st.st_size), state)
+
+    @app.route("/api/heartbeat/status", methods=["GET"])
+    def api_heartbeat_status():
+        state = _read_state_file(app.config["HEARTBEAT_FILE"])
+        return jsonify({"active": state == "on"}), 200
 
     @app.route("/api/heartbeat/toggle", methods=["POST"])
     def api_heartbeat_toggle():
@@ -261,47 +597,27 @@ def create_app(testing=False, db_path_override=None):
             if provided != api_key:
                 return jsonify({"error": "forbidden"}), 403
 
-        hb_file = app.config.get(
-            "HEARTBEAT_FILE",
-            os.path.expanduser("~/agents/shared/.heartbeat-active")
-        )
-        try:
-            with open(hb_file, "r") as f:
-                current = f.read().strip().lower()
-        except FileNotFoundError:
-            current = "off"
+        hb_file = app.config["HEARTBEAT_FILE"]
+        current = _read_state_file(hb_file) or "off"
 
         new_state = "off" if current == "on" else "on"
-        with open(hb_file, "w") as f:
-            f.write(new_state + "\n")
+        _write_state_file(hb_file, new_state)
 
         # Sync dispatch state with heartbeat
-        dispatch_file = app.config.get(
-            "DISPATCH_FILE",
-            os.path.expanduser("~/agents/shared/dispatch/dispatch-enabled.txt")
-        )
         try:
-            with open(dispatch_file, "w") as f:
-                f.write(new_state + "\n")
+            _write_state_file(app.config["DISPATCH_FILE"], new_state)
         except OSError:
             pass
 
+        invalidate_activity_cache()
         return jsonify({"active": new_state == "on"}), 200
 
     # --- Dispatch toggle ---
 
     @app.route("/api/dispatch/status", methods=["GET"])
     def api_dispatch_status():
-        dispatch_file = app.config.get(
-            "DISPATCH_FILE",
-            os.path.expanduser("~/agents/shared/dispatch/dispatch-enabled.txt")
-        )
-        try:
-            with open(dispatch_file, "r") as f:
-                state = f.read().strip().lower()
-            return jsonify({"status": state}), 200
-        except FileNotFoundError:
-            return jsonify({"status": "off"}), 200
+        state = _read_state_file(app.config["DISPATCH_FILE"])
+        return jsonify({"status": "off" if state is None else state}), 200
 
     @app.route("/api/dispatch/toggle", methods=["POST"])
     def api_dispatch_toggle():
@@ -311,35 +627,52 @@ def create_app(testing=False, db_path_override=None):
             if provided != api_key:
                 return jsonify({"error": "forbidden"}), 403
 
-        dispatch_file = app.config.get(
-            "DISPATCH_FILE",
-            os.path.expanduser("~/agents/shared/dispatch/dispatch-enabled.txt")
-        )
-        try:
-            with open(dispatch_file, "r") as f:
-                current = f.read().strip().lower()
-        except FileNotFoundError:
-            current = "off"
+        dispatch_file = app.config["DISPATCH_FILE"]
+        current = _read_state_file(dispatch_file) or "off"
 
         new_state = "off" if current == "on" else "on"
-        with open(dispatch_file, "w") as f:
-            f.write(new_state + "\n")
+        _write_state_file(dispatch_file, new_state)
 
         return jsonify({"status": new_state}), 200
 
     # --- Activity feed ---
 
-    @app.route("/api/activity", methods=["GET"])
-    def api_activity():
-        from models import get_all_agents
+    def _read_git_head(project_dir):
+        """Resolve HEAD to a commit sha by reading .git directly.
 
-        events = []
+        Returns None when it can't be resolved (not a repo, worktree .git
+        file, unusual ref layout) so the caller skips the cache.
+        """
+        git_dir = os.path.join(project_dir, ".git")
+        try:
+            with open(os.path.join(git_dir, "HEAD")) as f:
+                head = f.read().strip()
+            if not head.startswith("ref: "):
+                return head or None
+            ref = head[len("ref: "):]
+            try:
+                with open(os.path.join(git_dir, ref)) as f:
+                    return f.read().strip() or None
+            except FileNotFoundError:
+                with open(os.path.join(git_dir, "packed-refs")) as f:
+                    for line in f:
+                        sha, _, name = line.strip().partition(" ")
+                        if name == ref:
+                            return sha
+        except OSError:
+            pass
+        return None
 
-        # 1. Git commits
-        project_dir = app.config.get(
-            "PROJECT_DIR",
-            os.path.expanduser("~/projects/cc-team-dashboard")
-        )
+    def _git_commit_events(project_dir):
+        """Return the last 20 commits in project_dir as activity events.
+
+        The log only changes when HEAD moves, so it's cached by HEAD sha.
+        """
+        head = _read_git_head(project_dir)
+        if head is not None and _git_log_cache["key"] == (project_dir, head):
+            return _git_log_cache["events"]
+
+        events = []
         try:
             result = subprocess.run(
                 ["git", "log", "--format=%h||%an||%s||%aI", "-20"],
@@ -358,71 +691,300 @@ def create_app(testing=False, db_path_override=None):
                             "agent": parts[1],
                             "message": f"{parts[0]} {parts[2]}"
                         })
+                if head is not None:
+                    _git_log_cache.update(key=(project_dir, head),
+                                          events=events)
         except (subprocess.TimeoutExpired, FileNotFoundError):
             pass
+        return events
 
-        # 2. Heartbeat events from DB
-        conn = get_db_connection(app.config["DATABASE_PATH"])
+    def _slack_channel_history(channel_id, token):
+        """Fetch recent messages for one Slack channel. Empty on failure."""
         try:
-            agents = get_all_agents(conn)
-            for a in agents:
+            resp = _slack_http.get(
+                f"https://slack.com/api/conversations.history"
+                f"?channel={channel_id}&limit=10",
+                headers={"Authorization": f"Bearer {token}"},
+                timeout=5,
+            )
+            data = orjson.loads(resp.content)
+            if data.get("ok"):
+                return data.get("messages", [])
+        except (requests.RequestException, ValueError):
+            pass
+        return []
+
+    def _event_key(event):
+        return event.get("timestamp", "")
+
+    def _fetch_external_events(project_dir, token, channels,
+                               on_waiting=None):
+        """Fetch git and Slack events concurrently, bounded by a deadline.
+
+        Returns (sources, complete): one list per source (git, then each
+        Slack channel), each sorted newest first so they can be k-way
+        merged, and whether every source finished before the deadline.
+        on_waiting, if given, runs on the calling thread while the fetches
+        are in flight so the caller can overlap its own work.
+        """
+        deadline = time.monotonic() + ACTIVITY_FETCH_DEADLINE
+
+        # Fan out the slow sources (git subprocess, one Slack call per
+        # channel) so the fetch costs max(RTT) instead of sum(RTT).
+        git_future = _io_executor.submit(_git_commit_events, project_dir)
+
+        history_futures = {}
+        if token and channels:
+            history_futures = {
+                _io_executor.submit(_slack_channel_history, channel_id, token):
+                    channel_id
+                for channel_id in channels
+            }
+
+        if on_waiting is not None:
+            on_waiting()
+
+        sources = []
+        done, not_done = wait([git_future, *history_futures],
+                              timeout=max(0, deadline - time.monotonic()))
+        if git_future in done:
+            # git log is ordered by commit date; author dates can disagree
+            sources.append(sorted(git_future.result(), key=_event_key,
+                                  reverse=True))
+
+        channel_messages = [
+            (history_futures[f], f.result())
+            for f in history_futures if f in done
+        ]
+
+        # Resolve each unique Slack user once, concurrently
+        fallbacks = {}
+        for _, messages in channel_messages:
+            for msg in messages:
+                raw_user = msg.get("user", "unknown")
+                if raw_user != "unknown" and raw_user not in fallbacks:
+                    fallbacks[raw_user] = (
+                        (msg.get("bot_profile") or {}).get("name", "")
+                    )
+        display_names = resolve_slack_users(
+            get_conn(), fallbacks, token, deadline
+        )
+
+        for channel_id, messages in channel_messages:
+            events = []
+            for msg in messages:
+                ts = msg.get("ts", "0")
+                try:
+                    dt = datetime.fromtimestamp(
+                        float(ts), tz=timezone.utc
+                    ).isoformat()
+                except (ValueError, OSError):
+                    dt = ""
+                raw_user = msg.get("user", "unknown")
+                display_name = display_names.get(raw_user, "unknown")
+                msg_text = msg.get("text", "")
+                agent_name = _infer_agent_name(
+                    display_name, channel_id, msg_text
+                )
+                events.append({
+                    "type": "slack",
+                    "timestamp": dt,
+                    "agent": agent_name,
+                    "message": msg_text[:200],
+                })
+            # conversations.history is newest first; sort guards the rest
+            events.sort(key=_event_key, reverse=True)
+            sources.append(events)
+
+        return sources, not not_done
+
+    def _polled_external_events(key):
+        """Return the poller's (sources, complete) for key, or None if stale."""
+        interval = app.config.get("ACTIVITY_POLL_INTERVAL", 0)
+        with _activity_lock:
+            polled = dict(_external_events)
+        if (polled["sources"] is None or polled["key"] != key
+                or time.time() - polled["timestamp"] > 3 * max(interval, 1)):
+            return None
+        return polled["sources"], polled["complete"]
+
+    def _collect_activity(project_dir, token, channels):
+        """Gather the 20 newest git, heartbeat and Slack events.
+
+        Returns (events, complete); complete is False when a git or Slack
+        source missed the fetch deadline.
+        """
+        from models import get_all_agents
+
+        heartbeats = []
+
+        def add_heartbeats():
+            # Heartbeat events come from the DB on this request's connection
+            for a in get_all_agents(get_conn()):
                 if a.get("last_active"):
-                    events.append({
+                    heartbeats.append({
                         "type": "heartbeat",
                         "timestamp": a["last_active"],
                         "agent": a["name"],
                         "message": f"Heartbeat from {a['name']} — {a.get('status', 'unknown')}"
                     })
-        finally:
-            conn.close()
-
-        # 3. Slack messages
+            heartbeats.sort(key=_event_key, reverse=True)
+
+        polled = _polled_external_events((project_dir, token, tuple(channels)))
+        if polled is not None:
+            sources, complete = polled
+            add_heartbeats()
+        else:
+            sources, complete = _fetch_external_events(
+                project_dir, token, channels, on_waiting=add_heartbeats)
+
+        # Every source is already newest first: merge and stop at 20
+        return list(islice(
+            heapq.merge(heartbeats, *sources, key=_event_key, reverse=True),
+            20,
+        )), complete
+
+    def refresh_activity_sources():
+        """Re-fetch git and Slack events into the poller snapshot."""
+        project_dir = app.config["PROJECT_DIR"]
         token = app.config.get("SLACK_BOT_TOKEN", "")
         channels = app.config.get("SLACK_CHANNELS", [])
-        if token and channels:
-            for channel_id in channels:
-                try:
-                    url = (
-                        f"https://slack.com/api/conversations.history"
-                        f"?channel={channel_id}&limit=10"
-                    )
-                    req = urllib.request.Request(url, headers={
-                        "Authorization": f"Bearer {token}",
-                        "Content-Type": "application/json"
-                    })
-                    with urllib.request.urlopen(req, timeout=5) as resp:
-                        data = json.loads(resp.read().decode())
-                    if data.get("ok"):
-                        for msg in data.get("messages", []):
-                            ts = msg.get("ts", "0")
-                            try:
-                                dt = datetime.fromtimestamp(
-                                    float(ts), tz=timezone.utc
-                                ).isoformat()
-                            except (ValueError, OSError):
-                                dt = ""
-                            raw_user = msg.get("user", "unknown")
-                            bot_name = (msg.get("bot_profile") or {}).get("name", "")
-                            display_name = resolve_slack_user(
-                                raw_user, token, fallback_name=bot_name
-                            ) if raw_user != "unknown" else "unknown"
-                            msg_text = msg.get("text", "")
-                            agent_name = _infer_agent_name(
-                                display_name, channel_id, msg_text
-                            )
-                            events.append({
-                                "type": "slack",
-                                "timestamp": dt,
-                                "agent": agent_name,
-                                "message": msg_text[:200],
-                            })
-                except (urllib.error.URLError, OSError, ValueError):
-                    pass
-
-        # Sort by timestamp descending
-        events.sort(key=lambda e: e.get("timestamp", ""), reverse=True)
-
-        return jsonify(events[:20]), 200
+        key = (project_dir, token, tuple(channels))
+        with app.app_context():
+            sources, complete = _fetch_external_events(project_dir, token,
+                                                       channels)
+        with _activity_lock:
+            changed = (_external_events["key"] != key
+                       or _external_events["sources"] != sources)
+            _external_events.update(key=key, sources=sources,
+                                    complete=complete, timestamp=time.time())
+        if changed:
+            invalidate_activity_cache()
+
+    app.extensions["refresh_activity_sources"] = refresh_activity_sources
+
+    def _run_activity_poller(interval):
+        while True:
+            try:
+                refresh_activity_sources()
+            except Exception:
+                app.logger.exception("activity refresh failed")
+            time.sleep(interval)
+
+    @app.before_request
+    def _start_activity_poller():
+        # Started on the first request rather than in create_app so the
+        # debug reloader's parent process never spawns its own poller
+        interval = app.config.get("ACTIVITY_POLL_INTERVAL", 0)
+        if app.testing or interval <= 0 or _activity_poller["started"]:
+            return
+        with _activity_lock:
+            if _activity_poller["started"]:
+                return
+            _activity_poller["started"] = True
+        threading.Thread(target=_run_activity_poller, args=(interval,),
+                         name="activity-poller", daemon=True).start()
+
+    def _activity_snapshot():
+        """Return (body, etag) of the activity feed, refreshing it when stale.
+
+        Must run inside an app context since the heartbeat query uses get_conn().
+        """
+        project_dir = app.config["PROJECT_DIR"]
+        token = app.config.get("SLACK_BOT_TOKEN", "")
+        channels = app.config.get("SLACK_CHANNELS", [])
+        key = (project_dir, token, tuple(channels))
+        cache_ttl = app.config.get("ACTIVITY_CACHE_TTL", 5)
+
+        def fresh():
+            with _activity_lock:
+                cached = dict(_activity_cache)
+            if (cached["body"] is not None and cached["key"] == key
+                    and time.time() - cached["timestamp"] < cache_ttl):
+                return cached["body"], cached["etag"]
+            return None
+
+        hit = fresh()
+        if hit is not None:
+            return hit
+        with _activity_refresh_lock:
+            # Another request may have refreshed it while we waited
+            hit = fresh()
+            if hit is not None:
+                return hit
+            now = time.time()
+            with _activity_lock:
+                generation = _activity_cache["generation"]
+            events, complete = _collect_activity(project_dir, token, channels)
+            body = orjson.dumps(events)
+            etag = hashlib.md5(body).hexdigest()
+            with _activity_lock:
+                # A write invalidated the feed mid-recompute, or a source
+                # timed out; serve this result once but let the next
+                # request rebuild it
+                if complete and _activity_cache["generation"] == generation:
+                    _activity_cache.update(key=key, body=body, etag=etag,
+                                           timestamp=now)
+        return body, etag
+
+    @app.route("/api/activity", methods=["GET"])
+    def api_activity():
+        body, etag = _activity_snapshot()
+        resp = app.response_class(body, mimetype="application/json")
+        resp.set_etag(etag)
+        return resp.make_conditional(request)
+
+    @app.route("/api/activity/stream", methods=["GET"])
+    def api_activity_stream():
+        """Push the activity feed as server-sent events.
+
+        Sends the current feed immediately, then again whenever a write
+        invalidates it or ACTIVITY_STREAM_INTERVAL elapses with a changed feed.
+        Each stream occupies a worker thread, so it is only served when
+        ACTIVITY_STREAM_ENABLED is set, and ends after ACTIVITY_STREAM_MAX_AGE
+        seconds with a retry hint so EventSource reconnects.
+        """
+        if not app.config.get("ACTIVITY_STREAM_ENABLED", False):
+            # EventSource treats the error as final and the page polls
+            return jsonify({"error": "activity stream disabled"}), 404
+
+        interval = app.config.get("ACTIVITY_STREAM_INTERVAL", 15)
+        max_age = app.config.get("ACTIVITY_STREAM_MAX_AGE", 300)
+
+        def generate():
+            wakeup = queue.Queue(maxsize=1)
+            with _activity_lock:
+                _activity_subscribers.add(wakeup)
+            deadline = time.monotonic() + max_age
+            last_etag = None
+            try:
+                while True:
+                    # Fresh app context per snapshot so the pooled connection
+                    # is returned instead of held for the life of the stream
+                    with app.app_context():
+                        body, etag = _activity_snapshot()
+                    if etag != last_etag:
+                        last_etag = etag
+                        yield b"event: activity\ndata: " + body + b"\n\n"
+                    else:
+                        yield b": keep-alive\n\n"
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        wakeup.get(timeout=min(interval, remaining))
+                    except queue.Empty:
+                        pass
+                # Release the worker; the browser reconnects after 1s
+                yield b"retry: 1000\n\n"
+            finally:
+                with _activity_lock:
+                    _activity_subscribers.discard(wakeup)
+
+        resp = app.response_class(generate(), mimetype="text/event-stream")
+        resp.headers["Cache-Control"] = "no-cache"
+        resp.headers["X-Accel-Buffering"] = "no"
+        return resp
 
     # --- GitHub Issues ---
 
@@ -457,15 +1019,63 @@ def create_app(testing=False, db_path_override=None):
             "User-Agent": "cc-team-dashboard",
         })
         with urllib.request.urlopen(req, timeout=10) as resp:
-            return json.loads(resp.read().decode())
+            return orjson.loads(resp.read())
+
+    def _fetch_repo_issues(repo, token):
+        """Fetch one repo's open issues as Kanban cards. Empty on failure."""
+        issues = []
+        try:
+            repo_issues = _github_get(
+                f"https://api.github.com/repos/{repo}/issues"
+                f"?state=open&per_page=100",
+                token,
+            )
+            for issue in repo_issues:
+                # Skip pull requests (GitHub API includes them)
+                if issue.get("pull_request"):
+                    continue
+
+                labels = issue.get("labels", [])
+                column = _map_column(labels)
+                assignee = issue.get("assignee")
+
+                # If no label-based column, infer from assignee
+                if column is None:
+                    if assignee:
+                        column = "Assigned"
+                    else:
+                        column = "Inbox"
+
+                issues.append({
+                    "id": issue["id"],
+                    "number": issue["number"],
+                    "title": issue["title"],
+                    "state": issue["state"],
+                    "column": column,
+                    "repo": repo,
+                    "url": issue["html_url"],
+                    "assignee": assignee["login"] if assignee else None,
+                    "labels": [
+                    {"name": l["name"], "color": l.get("color", "")}
+                    for l in labels
+                ],
+                    "created_at": issue["created_at"],
+                    "updated_at": issue["updated_at"],
+                })
+        except (urllib.error.URLError, OSError, ValueError, KeyError):
+            pass
+        return issues
 
     def _fetch_issues_from_github():
-        """Fetch open issues from all configured repos."""
+        """Fetch open issues from all configured repos.
+
+        Returns (issues, complete); complete is False when a repo fetch
+        missed GITHUB_FETCH_DEADLINE and its issues are absent.
+        """
         token = app.config.get("GITHUB_TOKEN", "")
         if not token:
-            return []
+            return [], True
 
-        issues = []
         repos = app.config.get("GITHUB_REPOS", [])
 
         # If no repos configured, fetch from user's repos
@@ -479,51 +1089,18 @@ def create_app(testing=False, db_path_override=None):
                 repos = [r["full_name"] for r in user_repos
                          if not r.get("fork") and not r.get("archived")]
             except (urllib.error.URLError, OSError, ValueError, KeyError):
-                return []
-
-        for repo in repos:
-            try:
-                repo_issues = _github_get(
-                    f"https://api.github.com/repos/{repo}/issues"
-                    f"?state=open&per_page=100",
-                    token,
-                )
-                for issue in repo_issues:
-                    # Skip pull requests (GitHub API includes them)
-                    if issue.get("pull_request"):
-                        continue
-
-                    labels = issue.get("labels", [])
-                    column = _map_column(labels)
-                    assignee = issue.get("assignee")
-
-                    # If no label-based column, infer from assignee
-                    if column is None:
-                        if assignee:
-                            column = "Assigned"
-                        else:
-                            column = "Inbox"
-
-                    issues.append({
-                        "id": issue["id"],
-                        "number": issue["number"],
-                        "title": issue["title"],
-                        "state": issue["state"],
-                        "column": column,
-                        "repo": repo,
-                        "url": issue["html_url"],
-                        "assignee": assignee["login"] if assignee else None,
-                        "labels": [
-                        {"name": l["name"], "color": l.get("color", "")}
-                        for l in labels
-                    ],
-                        "created_at": issue["created_at"],
-                        "updated_at": issue["updated_at"],
-                    })
-            except (urllib.error.URLError, OSError, ValueError, KeyError):
-                continue
+                return [], True
 
-        return issues
+        # One request per repo, overlapped on the GitHub pool; results
+        # are gathered in config order so the board layout stays stable
+        futures = [_github_executor.submit(_fetch_repo_issues, repo, token)
+                   for repo in repos]
+        done, not_done = wait(futures, timeout=GITHUB_FETCH_DEADLINE)
+        issues = []
+        for future in futures:
+            if future in done:
+                issues.extend(future.result())
+        return issues, not not_done
 
     @app.route("/api/issues", methods=["GET"])
     def api_issues():
@@ -534,9 +1111,12 @@ def create_app(testing=False, db_path_override=None):
                 and now - _issues_cache["timestamp"] < cache_ttl):
             return jsonify(_issues_cache["data"]), 200
 
-        issues = _fetch_issues_from_github()
-        _issues_cache["data"] = issues
-        _issues_cache["timestamp"] = now
+        issues, complete = _fetch_issues_from_github()
+        # A partial board is served but not cached, so the repos that
+        # timed out are retried on the next request
+        if complete:
+            _issues_cache["data"] = issues
+            _issues_cache["timestamp"] = now
 
         return jsonify(issues), 200
 
@@ -17,6 +17,7 @@ class Config:
     DATABASE_PATH = os.path.join(
         os.path.dirname(os.path.abspath(__file__)), "instance", "dashboard.db"
     )
+    DATABASE_POOL_SIZE = int(os.environ.get("DATABASE_POOL_SIZE", "5"))
     GITHUB_TOKEN = os.environ.get("GITHUB_TOKEN", "")
     GITHUB_REPOS = [
         r.strip()
@@ -25,6 +26,10 @@ class Config:
     ]
     ISSUE_REFRESH_INTERVAL = int(os.environ.get("ISSUE_REFRESH_INTERVAL", "300"))
     AGENT_HEARTBEAT_TIMEOUT = int(os.environ.get("AGENT_HEARTBEAT_TIMEOUT", "60"))
+    AGENTS_BASE_PATH = os.environ.get(
+        "AGENTS_BASE_PATH",
+        os.path.expanduser("~/agents")
+    )
     HEARTBEAT_FILE = os.environ.get(
         "HEARTBEAT_FILE",
         os.path.expanduser("~/agents/shared/.heartbeat-active")
@@ -35,6 +40,24 @@ class Config:
         for c in os.environ.get("SLACK_CHANNELS", "").split(",")
         if c.strip()
     ]
+    SLACK_USER_CACHE_TTL = int(os.environ.get("SLACK_USER_CACHE_TTL", "86400"))
+    SLACK_USER_NEGATIVE_TTL = int(os.environ.get("SLACK_USER_NEGATIVE_TTL", "300"))
+    ACTIVITY_CACHE_TTL = int(os.environ.get("ACTIVITY_CACHE_TTL", "5"))
+    # Server-sent activity updates hold one worker thread per open tab for
+    # up to ACTIVITY_STREAM_MAX_AGE, so they're off unless the server runs
+    # a threaded or async worker (e.g. gunicorn -k gthread --threads 16);
+    # otherwise the dashboard polls /api/activity
+    ACTIVITY_STREAM_ENABLED = os.environ.get(
+        "ACTIVITY_STREAM_ENABLED", ""
+    ).lower() in ("1", "true", "yes")
+    ACTIVITY_STREAM_INTERVAL = int(os.environ.get("ACTIVITY_STREAM_INTERVAL", "15"))
+    # Seconds before an activity stream closes and the browser reconnects
+    ACTIVITY_STREAM_MAX_AGE = int(os.environ.get("ACTIVITY_STREAM_MAX_AGE", "300"))
+    # Background git/Slack refresh period in seconds; 0 fetches per request
+    ACTIVITY_POLL_INTERVAL = int(os.environ.get("ACTIVITY_POLL_INTERVAL", "15"))
+    TERMINAL_CACHE_TTL = float(os.environ.get("TERMINAL_CACHE_TTL", "1"))
+    # Seconds a serialized /api/agents list is reused between writes
+    AGENTS_CACHE_TTL = float(os.environ.get("AGENTS_CACHE_TTL", "2"))
     PROJECT_DIR = os.environ.get(
         "PROJECT_DIR",
         os.path.expanduser("~/projects/cc-team-dashboard")
@@ -48,8 +71,12 @@ class Config:
 
 class TestConfig(Config):
     TESTING = True
+    # Templates never change mid-run; don't stat them on every render even
+    # when FLASK_DEBUG is set in the environment
+    TEMPLATES_AUTO_RELOAD = False
     SECRET_KEY = "test-secret-key-not-for-production"
     DATABASE_PATH = ":memory:"
     DASHBOARD_API_KEY = "test-admin-key"
     SLACK_BOT_TOKEN = ""
     SLACK_CHANNELS = []
+    ACTIVITY_STREAM_ENABLED = False
@@ -1,4 +1,8 @@
+import queue
 import sqlite3
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime, timezone, timedelta
 
 
@@ -20,41 +24,188 @@ def init_db(conn):
     columns = [col[1] for col in conn.execute("PRAGMA table_info(agents)").fetchall()]
     if 'role' not in columns:
         conn.execute("ALTER TABLE agents ADD COLUMN role TEXT NOT NULL DEFAULT ''")
+    # Serves the periodic offline sweep in check_heartbeat_timeouts
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_agents_status_last_active "
+        "ON agents(status, last_active)"
+    )
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS slack_users (
+            id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            expires_at INTEGER NOT NULL
+        )
+    """)
     conn.commit()
 
 
-def get_db_connection(db_path):
-    """Create a database connection."""
-    conn = sqlite3.connect(db_path)
+def _is_memory_db(db_path):
+    """True for ":memory:" and in-memory URIs like "file:x?mode=memory"."""
+    return db_path == ":memory:" or (
+        db_path.startswith("file:") and "mode=memory" in db_path
+    )
+
+
+def get_db_connection(db_path, **connect_kwargs):
+    """Create a database connection tuned for the heartbeat write load.
+
+    File databases run in WAL mode with synchronous=NORMAL so commits no
+    longer fsync on every heartbeat and readers don't block the writer.
+    Paths starting with "file:" are opened as SQLite URIs.
+    """
+    if db_path.startswith("file:"):
+        connect_kwargs.setdefault("uri", True)
+    conn = sqlite3.connect(db_path, **connect_kwargs)
     conn.row_factory = sqlite3.Row
+    if not _is_memory_db(db_path):
+        conn.execute("PRAGMA journal_mode=WAL")
+        # Checkpoint every ~4MB of WAL and truncate it back to 64MB after,
+        # so bursts of heartbeats can't grow the -wal file without bound
+        conn.execute("PRAGMA wal_autocheckpoint=1000")
+        conn.execute("PRAGMA journal_size_limit=67108864")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA mmap_size=134217728")
+    conn.execute("PRAGMA cache_size=-16000")
+    conn.execute("PRAGMA busy_timeout=5000")
+    conn.execute("PRAGMA foreign_keys=ON")
     return conn
 
 
-def create_agent(conn, name, role="", status="offline"):
-    """Create or update an agent. Returns the agent as a dict."""
-    now = datetime.now(timezone.utc).isoformat()
-    existing = conn.execute(
-        "SELECT id FROM agents WHERE name = ?", (name,)
-    ).fetchone()
+class PoolTimeoutError(sqlite3.OperationalError):
+    """No pooled connection was returned within the checkout timeout."""
 
-    if existing:
-        conn.execute(
-            "UPDATE agents SET role = ?, status = ?, last_active = ? WHERE name = ?",
-            (role, status, now, name),
-        )
+
+class ConnectionPool:
+    """A bounded pool of SQLite connections shared across requests.
+
+    Connections are opened lazily, up to ``size``, and handed back out
+    instead of being closed, so a request reuses an open handle (and its
+    warm page cache) rather than paying for sqlite3_open every time.
+    A private in-memory database only exists inside the connection that
+    created it, so such pools are clamped to a single connection; shared
+    cache URIs ("file:x?mode=memory&cache=shared") can be pooled.
+    When every connection is checked out, get() waits up to ``timeout``
+    seconds (matching busy_timeout) and then raises PoolTimeoutError, so
+    a leaked connection surfaces as an error instead of a hung request.
+    """
+
+    def __init__(self, db_path, size=5, timeout=5.0):
+        self.db_path = db_path
+        self.timeout = timeout
+        private = _is_memory_db(db_path) and "cache=shared" not in db_path
+        self.size = 1 if private else max(1, size)
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        return get_db_connection(self.db_path, check_same_thread=False,
+                                 isolation_level=None)
+
+    def get(self, timeout=None):
+        """Check out a connection, opening a new one if the pool has room.
+
+        timeout defaults to the pool's; raises PoolTimeoutError when no
+        connection comes back in time.
+        """
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            can_open = self._created < self.size
+            if can_open:
+                self._created += 1
+        if not can_open:
+            if timeout is None:
+                timeout = self.timeout
+            try:
+                return self._idle.get(timeout=timeout)
+            except queue.Empty:
+                raise PoolTimeoutError(
+                    f"all {self.size} pooled connections to {self.db_path} "
+                    f"are checked out; none returned within {timeout}s"
+                ) from None
+
+        try:
+            return self._connect()
+        except sqlite3.Error:
+            with self._lock:
+                self._created -= 1
+            raise
+
+    def put(self, conn):
+        """Return a connection to the pool, discarding any open transaction."""
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put(conn)
+
+    @contextmanager
+    def borrow(self):
+        """Check out a connection for the duration of a ``with`` block."""
+        conn = self.get()
+        try:
+            yield conn
+        finally:
+            self.put(conn)
+
+    def close(self):
+        """Close every idle connection held by the pool."""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._created -= 1
+
+
+def _executemany_atomic(conn, sql, rows):
+    """Run sql once per row inside a single transaction, rolling back on error."""
+    # Pooled connections run in autocommit mode; without an explicit BEGIN
+    # every row would be its own transaction
+    if not conn.in_transaction:
+        conn.execute("BEGIN")
+    try:
+        conn.executemany(sql, rows)
         conn.commit()
-        return dict(
-            conn.execute("SELECT * FROM agents WHERE name = ?", (name,)).fetchone()
-        )
+    except sqlite3.Error:
+        conn.rollback()
+        raise
 
-    conn.execute(
-        "INSERT INTO agents (name, role, status, last_active, created_at) VALUES (?, ?, ?, ?, ?)",
+
+def create_agent(conn, name, role="", status="offline"):
+    """Create or update an agent. Returns the agent as a dict."""
+    now = datetime.now(timezone.utc).isoformat()
+    row = conn.execute(
+        "INSERT INTO agents (name, role, status, last_active, created_at) VALUES (?, ?, ?, ?, ?) "
+        "ON CONFLICT(name) DO UPDATE SET role = excluded.role, status = excluded.status, "
+        "last_active = excluded.last_active RETURNING *",
         (name, role, status, now, now),
-    )
+    ).fetchall()[0]
     conn.commit()
-    return dict(
-        conn.execute("SELECT * FROM agents WHERE name = ?", (name,)).fetchone()
+    return dict(row)
+
+
+def create_agents_bulk(conn, agents):
+    """Create or update many agents in a single transaction.
+
+    agents is an iterable of (name, role, status) tuples. Returns the number
+    of rows written.
+    """
+    now = datetime.now(timezone.utc).isoformat()
+    rows = [(name, role, status, now, now) for name, role, status in agents]
+    _executemany_atomic(
+        conn,
+        "INSERT INTO agents (name, role, status, last_active, created_at) VALUES (?, ?, ?, ?, ?) "
+        "ON CONFLICT(name) DO UPDATE SET role = excluded.role, status = excluded.status, "
+        "last_active = excluded.last_active",
+        rows,
     )
+    return len(rows)
 
 
 def get_all_agents(conn):
@@ -72,20 +223,14 @@ def get_agent(conn, agent_id):
 def update_heartbeat(conn, agent_id, status=None, current_task=None):
     """Update agent's last_active timestamp. Optionally update status and current_task.
     Returns the updated agent dict, or None if not found."""
-    agent = get_agent(conn, agent_id)
-    if agent is None:
-        return None
-
     now = datetime.now(timezone.utc).isoformat()
-    new_status = status if status is not None else agent["status"]
-    new_task = current_task if current_task is not None else agent["current_task"]
-
-    conn.execute(
-        "UPDATE agents SET last_active = ?, status = ?, current_task = ? WHERE id = ?",
-        (now, new_status, new_task, agent_id),
-    )
+    rows = conn.execute(
+        "UPDATE agents SET last_active = ?, status = COALESCE(?, status), "
+        "current_task = COALESCE(?, current_task) WHERE id = ? RETURNING *",
+        (now, status, current_task, agent_id),
+    ).fetchall()
     conn.commit()
-    return get_agent(conn, agent_id)
+    return dict(rows[0]) if rows else None
 
 
 def check_heartbeat_timeouts(conn, timeout_seconds=60):
@@ -97,3 +242,32 @@ def check_heartbeat_timeouts(conn, timeout_seconds=60):
         (cutoff,),
     )
     conn.commit()
+
+
+def get_cached_slack_user(conn, user_id):
+    """Return the cached display name for a Slack user ID, or None if absent/expired."""
+    row = conn.execute(
+        "SELECT name FROM slack_users WHERE id = ? AND expires_at > ?",
+        (user_id, int(time.time())),
+    ).fetchone()
+    return row["name"] if row else None
+
+
+def cache_slack_user(conn, user_id, name, ttl_seconds):
+    """Store a Slack user's display name for ttl_seconds, replacing any old entry."""
+    conn.execute(
+        "INSERT OR REPLACE INTO slack_users (id, name, expires_at) VALUES (?, ?, ?)",
+        (user_id, name, int(time.time()) + ttl_seconds),
+    )
+    conn.commit()
+
+
+def cache_slack_users(conn, names, ttl_seconds):
+    """Store many (user_id, name) pairs for ttl_seconds in one batch."""
+    expires_at = int(time.time()) + ttl_seconds
+    rows = [(user_id, name, expires_at) for user_id, name in names]
+    _executemany_atomic(
+        conn,
+        "INSERT OR REPLACE INTO slack_users (id, name, expires_at) VALUES (?, ?, ?)",
+        rows,
+    )
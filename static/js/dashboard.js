@@ -240,46 +240,57 @@
         fetchAllTerminals();
     }
 
-    function fetchTerminal(name) {
+    function renderTerminal(name, data) {
+        var body = document.getElementById('term-body-' + name);
+        var status = document.getElementById('term-status-' + name);
+        if (!body || !status) return;
+
+        if (data && data.output !== undefined) {
+            var output = data.output || '';
+            if (output.trim() === '') {
+                body.innerHTML = '<span class="terminal-empty">No output</span>';
+            } else {
+                body.textContent = output;
+            }
+            status.textContent = 'live';
+            status.style.color = '';
+        } else if (data === null) {
+            body.innerHTML = '<span class="terminal-empty">Parse error</span>';
+            status.textContent = 'error';
+            status.style.color = 'var(--status-red)';
+        } else {
+            body.innerHTML = '<span class="terminal-empty">No tmux session</span>';
+            status.textContent = 'disconnected';
+            status.style.color = 'var(--status-red)';
+        }
+    }
+
+    // One request for every visible terminal instead of one per agent
+    function fetchAllTerminals() {
+        if (knownAgentNames.length === 0) return;
         var xhr = new XMLHttpRequest();
-        xhr.open('GET', '/api/agents/' + encodeURIComponent(name) + '/terminal', true);
+        xhr.open('GET', '/api/agents/terminals?names='
+            + encodeURIComponent(knownAgentNames.join(',')), true);
         xhr.onreadystatechange = function () {
             if (xhr.readyState !== 4) return;
-            var body = document.getElementById('term-body-' + name);
-            var status = document.getElementById('term-status-' + name);
-            if (!body || !status) return;
-
+            var terminals = {};
+            var parseFailed = false;
             if (xhr.status === 200) {
                 try {
-                    var data = JSON.parse(xhr.responseText);
-                    var output = data.output || '';
-                    if (output.trim() === '') {
-                        body.innerHTML = '<span class="terminal-empty">No output</span>';
-                    } else {
-                        body.textContent = output;
-                    }
-                    status.textContent = 'live';
-                    status.style.color = '';
+                    terminals = JSON.parse(xhr.responseText) || {};
                 } catch (e) {
-                    body.innerHTML = '<span class="terminal-empty">Parse error</span>';
-                    status.textContent = 'error';
-                    status.style.color = 'var(--status-red)';
+                    parseFailed = true;
                 }
-            } else {
-                body.innerHTML = '<span class="terminal-empty">No tmux session</span>';
-                status.textContent = 'disconnected';
-                status.style.color = 'var(--status-red)';
+            }
+            for (var i = 0; i < knownAgentNames.length; i++) {
+                var name = knownAgentNames[i];
+                // null tells renderTerminal the response was unreadable
+                renderTerminal(name, parseFailed ? null : (terminals[name] || {}));
             }
         };
         xhr.send();
     }
 
-    function fetchAllTerminals() {
-        for (var i = 0; i < knownAgentNames.length; i++) {
-            fetchTerminal(knownAgentNames[i]);
-        }
-    }
-
     // --- WORKING.md display (dashboard cards) ---
 
     function fetchWorkingMd(agentId, agentName) {
@@ -536,6 +547,38 @@
         xhr.send();
     }
 
+    function startActivityPolling() {
+        fetchActivity();
+        setInterval(fetchActivity, ACTIVITY_REFRESH_INTERVAL);
+    }
+
+    // Subscribe to pushed activity updates; fall back to polling when the
+    // server has streaming off, EventSource is unavailable, or the stream
+    // gets closed for good.
+    function startActivityStream() {
+        var feed = document.getElementById('activity-feed');
+        if (!window.EventSource || !feed || !feed.hasAttribute('data-stream')) {
+            startActivityPolling();
+            return;
+        }
+        var source = new EventSource('/api/activity/stream');
+        source.addEventListener('activity', function (msg) {
+            try {
+                renderActivityFeed(JSON.parse(msg.data));
+            } catch (e) {
+                var container = document.getElementById('activity-feed');
+                if (container) {
+                    container.innerHTML = '<p class="error-msg">Failed to parse activity.</p>';
+                }
+            }
+        });
+        source.onerror = function () {
+            if (source.readyState === EventSource.CLOSED) {
+                startActivityPolling();
+            }
+        };
+    }
+
     // --- Issues / Kanban ---
 
     var COLUMN_IDS = {
@@ -720,7 +763,7 @@
         fetchAgents();
         initFilters();
         initHeartbeatToggle();
-        fetchActivity();
+        startActivityStream();
         fetchIssues();
         initViewToggle();
         setInterval(fetchAgents, REFRESH_INTERVAL);
@@ -729,7 +772,6 @@
                 fetchAllTerminals();
             }
         }, TERMINAL_REFRESH_INTERVAL);
-        setInterval(fetchActivity, ACTIVITY_REFRESH_INTERVAL);
         setInterval(fetchIssues, ISSUES_REFRESH_INTERVAL);
     }
 
@@ -0,0 +1,59 @@
+import os
+import sqlite3
+import uuid
+import pytest
+from app import create_app
+from models import create_agent, create_agents_bulk
+
+
+@pytest.fixture(scope="session")
+def app():
+    """Create one app per test session on a shared-cache in-memory DB.
+
+    Modules that write state reset it per test (see _isolate in
+    test_api.py); the page tests only read.
+    """
+    # Named per xdist worker too, so parallel workers never share a DB
+    worker = os.environ.get("PYTEST_XDIST_WORKER", "main")
+    db_uri = f"file:test_{worker}_{uuid.uuid4().hex}?mode=memory&cache=shared"
+    # The DB lives only while a connection is open; hold one for the session
+    keepalive = sqlite3.connect(db_uri, uri=True)
+    app = create_app(testing=True, db_path_override=db_uri)
+    yield app
+    app.extensions["db_pool"].close()
+    keepalive.close()
+
+
+@pytest.fixture(scope="session")
+def client(app):
+    # The app sets no cookies or session, so one client can serve every test
+    with app.test_client() as client:
+        yield client
+
+
+@pytest.fixture
+def register_agent(app):
+    """Factory that inserts an agent row directly and returns it as a dict.
+
+    Skips the HTTP round trip for tests that only need an agent to exist;
+    tests of the register endpoint itself should POST instead.
+    """
+    def _register(name="kat", role="backend", status="online"):
+        with app.extensions["db_pool"].borrow() as conn:
+            return create_agent(conn, name, role=role, status=status)
+    return _register
+
+
+@pytest.fixture
+def register_agents(app):
+    """Factory that inserts many (name, role, status) rows in one transaction."""
+    def _register(agents):
+        with app.extensions["db_pool"].borrow() as conn:
+            return create_agents_bulk(conn, agents)
+    return _register
+
+
+@pytest.fixture
+def kat_agent(register_agent):
+    """The agent "kat", registered for the test."""
+    return register_agent("kat")
@@ -1,104 +1,210 @@
+import functools
 import io
 import json
+import os
+import subprocess
+import threading
 import time
 import urllib.error
+import models
+import orjson
 import pytest
-from unittest.mock import patch, MagicMock
-from app import create_app
-from models import get_db_connection
+import requests
+from datetime import timedelta
+from unittest.mock import patch
+from freezegun import freeze_time
+from app import _render_markdown
+
+# Every tmux/git/HTTP call is faked; a test that hangs has let a real one
+# through, so fail it fast instead of waiting on socket or tmux timeouts
+pytestmark = pytest.mark.timeout(5, method="thread")
+
+
+class FakeResponse:
+    """Stand-in for a requests response carrying a JSON body.
+
+    Exposes .content over bytes encoded once, without MagicMock's
+    attribute machinery.
+    """
+
+    def __init__(self, payload):
+        if isinstance(payload, bytes):
+            self.content = payload
+        else:
+            self.content = json.dumps(payload).encode()
+
+
+class SlackRoutes(dict):
+    """Fake Slack Web API keyed by method name, e.g. "users.info".
+
+    Values are a response, an exception to raise, or a callable taking the
+    URL. Unmapped methods fail like a token missing that scope.
+    """
+
+    def __init__(self, mock):
+        super().__init__()
+        self._mock = mock
+
+    def __call__(self, url, **kwargs):
+        method = url.split("/api/", 1)[1].split("?", 1)[0]
+        route = self.get(method, requests.ConnectionError("missing_scope"))
+        if isinstance(route, Exception):
+            raise route
+        return route(url) if callable(route) else route
+
+    def calls(self, method):
+        """URLs requested for one API method so far."""
+        return [c.args[0] for c in self._mock.call_args_list
+                if f"/api/{method}?" in c.args[0]]
+
+
+def _completed(returncode=0, stdout="", stderr=""):
+    """A finished subprocess.run result; cheaper than a MagicMock."""
+    return subprocess.CompletedProcess([], returncode, stdout, stderr)
+
+
+def _slack_history_resp(messages):
+    """Fake conversations.history response carrying messages."""
+    return FakeResponse({"ok": True, "messages": messages})
+
+
+# Pre-encoded register payload for the many tests that just need "kat"
+_REGISTER_KAT_BODY = json.dumps(
+    {"name": "kat", "role": "backend", "status": "online"}
+).encode()
+_HEARTBEAT_IDLE_BODY = json.dumps({"status": "idle"}).encode()
+_HEARTBEAT_TASK_BODY = json.dumps({"current_task": "working on issue #7"}).encode()
+
+
+# git log output with more commits than the activity feed returns
+_25_COMMITS_STDOUT = "".join(
+    f"abc{i:04d}||Dan||Commit {i}||2025-01-{15 - (i % 15):02d}T10:00:00+00:00\n"
+    for i in range(25)
+)
+
+
+@functools.lru_cache(maxsize=None)
+def _user_info_bytes(display_name, real_name):
+    """Encoded users.info payload; identical per name pair, so built once."""
+    return json.dumps({
+        "ok": True,
+        "user": {
+            "real_name": real_name,
+            "profile": {"display_name": display_name},
+        },
+    }).encode()
+
+
+def _seed_agents_base(tmp_path_factory, working_files):
+    """Create an agents tree with one <name>/WORKING.md per entry."""
+    base = tmp_path_factory.mktemp("agents")
+    for name, text in working_files.items():
+        (base / name).mkdir()
+        (base / name / "WORKING.md").write_text(text)
+    return base
+
+
+def _json(resp):
+    """Decode a JSON response body, skipping Flask's mimetype checks."""
+    return orjson.loads(resp.get_data())
+
+
+@pytest.fixture(autouse=True)
+def _isolate(app):
+    """Give each test empty tables and cold caches.
+
+    Config changes are made with monkeypatch.setitem, which undoes them.
+    """
+    yield
+    with app.extensions["db_pool"].borrow() as conn:
+        conn.execute("DELETE FROM agents")
+        conn.execute("DELETE FROM slack_users")
+        conn.execute("DELETE FROM sqlite_sequence")
+    app.extensions["reset_caches"]()
+
+
+@pytest.fixture(scope="module")
+def _io_patches():
+    """Patch tmux/git and outbound HTTP once for the whole module."""
+    with patch("app.subprocess.run") as run, \
+            patch("urllib.request.urlopen") as urlopen, \
+            patch("app._slack_http.get") as slack_get:
+        yield run, urlopen, slack_get
+
+
+@pytest.fixture(autouse=True)
+def _no_real_io(_io_patches):
+    """Keep every test off real tmux/git processes and the network.
+
+    Resets the module-wide fakes: subprocess.run returns a failed, empty
+    result unless a test configures it; outbound HTTP raises.
+    """
+    run, urlopen, slack_get = _io_patches
+    for mock in _io_patches:
+        mock.reset_mock(return_value=True, side_effect=True)
+    run.return_value = _completed(returncode=1)
+    urlopen.side_effect = urllib.error.URLError("network disabled in tests")
+    slack_get.side_effect = requests.ConnectionError("network disabled in tests")
 
 
 @pytest.fixture
-def app(tmp_path):
-    """Create app with a temp file DB so connections share state."""
-    db_path = str(tmp_path / "test.db")
-    app = create_app(testing=True, db_path_override=db_path)
-    yield app
+def subprocess_mock(_io_patches, _no_real_io):
+    """The patched app.subprocess.run, reset for this test."""
+    return _io_patches[0]
 
 
 @pytest.fixture
-def client(app):
-    return app.test_client()
+def slack_api(app, monkeypatch, _io_patches, _no_real_io):
+    """Configure a Slack token and route _slack_http.get through SlackRoutes."""
+    monkeypatch.setitem(app.config, "SLACK_BOT_TOKEN", "xoxb-test")
+    monkeypatch.setitem(app.config, "SLACK_CHANNELS", ["C123"])
+    slack_get = _io_patches[2]
+    routes = SlackRoutes(slack_get)
+    slack_get.side_effect = routes
+    return routes
 
 
 # --- POST /api/agents/register ---
 
 class TestRegisterAgent:
-    def test_register_new_agent(self, client):
-        resp = client.post("/api/agents/register", json={
-            "name": "kat",
-            "role": "backend",
-            "status": "online"
-        })
-        assert resp.status_code == 201
-        data = resp.get_json()
-        assert data["name"] == "kat"
-        assert data["role"] == "backend"
-        assert data["status"] == "online"
-        assert "id" in data
+    @pytest.mark.parametrize("payload,expected_status,expected_fields", [
+        ({"name": "kat", "role": "backend", "status": "online"}, 201,
+         {"name": "kat", "role": "backend", "status": "online"}),
+        ({"role": "backend", "status": "online"}, 400, {}),
+        ({}, 400, {}),
+        ({"name": "sam", "role": "frontend"}, 201, {"status": "online"}),
+        ({"name": "mat"}, 201, {"role": ""}),
+    ], ids=["new-agent", "missing-name", "empty-body", "default-status",
+            "default-role"])
+    def test_register(self, client, payload, expected_status, expected_fields):
+        resp = client.post("/api/agents/register", json=payload)
+        assert resp.status_code == expected_status
+        if expected_status == 201:
+            data = _json(resp)
+            assert "id" in data
+            for field, value in expected_fields.items():
+                assert data[field] == value
 
     def test_register_updates_existing_agent(self, client):
-        client.post("/api/agents/register", json={
-            "name": "kat",
-            "role": "backend",
-            "status": "online"
-        })
+        client.post("/api/agents/register", data=_REGISTER_KAT_BODY,
+                    content_type="application/json")
         resp = client.post("/api/agents/register", json={
             "name": "kat",
             "role": "backend",
             "status": "idle"
         })
         assert resp.status_code == 200
-        data = resp.get_json()
+        data = _json(resp)
         assert data["status"] == "idle"
 
-    def test_register_missing_name_returns_400(self, client):
-        resp = client.post("/api/agents/register", json={
-            "role": "backend",
-            "status": "online"
-        })
-        assert resp.status_code == 400
-
-    def test_register_missing_body_returns_400(self, client):
-        resp = client.post("/api/agents/register",
-                           content_type="application/json",
-                           data="{}")
-        assert resp.status_code == 400
-
-    def test_register_defaults_status_to_online(self, client):
-        resp = client.post("/api/agents/register", json={
-            "name": "sam",
-            "role": "frontend"
-        })
-        assert resp.status_code == 201
-        data = resp.get_json()
-        assert data["status"] == "online"
-
-    def test_register_defaults_role_to_empty(self, client):
-        resp = client.post("/api/agents/register", json={
-            "name": "mat"
-        })
-        assert resp.status_code == 201
-        data = resp.get_json()
-        assert data["role"] == ""
-
 
 # --- POST /api/agents/<id>/heartbeat ---
 
 class TestHeartbeat:
-    def _register(self, client, name="kat"):
-        resp = client.post("/api/agents/register", json={
-            "name": name,
-            "role": "backend",
-            "status": "online"
-        })
-        return resp.get_json()
-
-    def test_heartbeat_updates_last_active(self, client):
-        agent = self._register(client)
-        resp = client.post(f"/api/agents/{agent['id']}/heartbeat")
+    def test_heartbeat_updates_last_active(self, client, kat_agent):
+        resp = client.post(f"/api/agents/{kat_agent['id']}/heartbeat")
         assert resp.status_code == 200
-        data = resp.get_json()
+        data = _json(resp)
         assert data["status"] == "online"
         assert "last_active" in data
 
@@ -106,20 +212,20 @@ class TestHeartbeat:
         resp = client.post("/api/agents/9999/heartbeat")
         assert resp.status_code == 404
 
-    def test_heartbeat_accepts_optional_status(self, client):
-        agent = self._register(client)
-        resp = client.post(f"/api/agents/{agent['id']}/heartbeat",
-                           json={"status": "idle"})
+    def test_heartbeat_accepts_optional_status(self, client, kat_agent):
+        resp = client.post(f"/api/agents/{kat_agent['id']}/heartbeat",
+                           data=_HEARTBEAT_IDLE_BODY,
+                           content_type="application/json")
         assert resp.status_code == 200
-        data = resp.get_json()
+        data = _json(resp)
         assert data["status"] == "idle"
 
-    def test_heartbeat_accepts_optional_current_task(self, client):
-        agent = self._register(client)
-        resp = client.post(f"/api/agents/{agent['id']}/heartbeat",
-                           json={"current_task": "working on issue #7"})
+    def test_heartbeat_accepts_optional_current_task(self, client, kat_agent):
+        resp = client.post(f"/api/agents/{kat_agent['id']}/heartbeat",
+                           data=_HEARTBEAT_TASK_BODY,
+                           content_type="application/json")
         assert resp.status_code == 200
-        data = resp.get_json()
+        data = _json(resp)
         assert data["current_task"] == "working on issue #7"
 
 
@@ -129,572 +235,749 @@ class TestListAgents:
     def test_list_empty(self, client):
         resp = client.get("/api/agents")
         assert resp.status_code == 200
-        data = resp.get_json()
+        data = _json(resp)
         assert data == []
 
-    def test_list_returns_registered_agents(self, client):
-        client.post("/api/agents/register", json={
-            "name": "kat", "role": "backend", "status": "online"
-        })
-        client.post("/api/agents/register", json={
-            "name": "sam", "role": "frontend", "status": "idle"
-        })
+    def test_list_returns_registered_agents(self, client, register_agents):
+        register_agents([("kat", "backend", "online"), ("sam", "frontend", "idle")])
         resp = client.get("/api/agents")
-        data = resp.get_json()
+        data = _json(resp)
         assert len(data) == 2
         names = [a["name"] for a in data]
         assert "kat" in names
         assert "sam" in names
 
-    def test_list_includes_role_field(self, client):
-        client.post("/api/agents/register", json={
-            "name": "kat", "role": "backend"
-        })
+    def test_list_includes_role_field(self, client, register_agent):
+        register_agent("kat", role="backend")
         resp = client.get("/api/agents")
-        data = resp.get_json()
+        data = _json(resp)
         assert data[0]["role"] == "backend"
 
+    def test_list_is_cached_until_a_heartbeat(self, client, register_agent,
+                                              kat_agent):
+        assert len(_json(client.get("/api/agents"))) == 1
+        # Written behind the API's back, so the cached list still applies
+        register_agent("sam")
+        assert len(_json(client.get("/api/agents"))) == 1
+
+        client.post(f"/api/agents/{kat_agent['id']}/heartbeat",
+                    data=_HEARTBEAT_IDLE_BODY, content_type="application/json")
+        data = _json(client.get("/api/agents"))
+        assert [a["name"] for a in data] == ["kat", "sam"]
+        assert data[0]["status"] == "idle"
+
+    def test_list_write_during_read_is_not_cached(self, app, client,
+                                                  kat_agent, monkeypatch):
+        """A heartbeat landing after the rows were read must not be hidden."""
+        real_get_all_agents = models.get_all_agents
+        heartbeats = []
+
+        def get_all_agents(conn):
+            rows = real_get_all_agents(conn)
+            if not heartbeats:
+                heartbeats.append(app.test_client().post(
+                    f"/api/agents/{kat_agent['id']}/heartbeat",
+                    data=_HEARTBEAT_IDLE_BODY,
+                    content_type="application/json"))
+            return rows
+
+        monkeypatch.setattr("models.get_all_agents", get_all_agents)
+
+        assert _json(client.get("/api/agents"))[0]["status"] == "online"
+        assert heartbeats[0].status_code == 200
+        assert _json(client.get("/api/agents"))[0]["status"] == "idle"
+
 
 # --- Heartbeat timeout logic ---
 
 class TestHeartbeatTimeout:
-    def test_agent_marked_offline_after_timeout(self, app, client):
-        """Agent with stale last_active should be marked offline."""
-        resp = client.post("/api/agents/register", json={
-            "name": "stale-agent", "role": "backend", "status": "online"
-        })
-        agent = resp.get_json()
-
-        # Manually backdate last_active to 120 seconds ago
-        from datetime import datetime, timezone, timedelta
-        stale_time = (datetime.now(timezone.utc) - timedelta(seconds=120)).isoformat()
-        with app.app_context():
-            conn = get_db_connection(app.config["DATABASE_PATH"])
-            conn.execute(
-                "UPDATE agents SET last_active = ? WHERE id = ?",
-                (stale_time, agent["id"])
-            )
-            conn.commit()
-            conn.close()
-
-        # GET /api/agents should show this agent as offline
-        resp = client.get("/api/agents")
-        data = resp.get_json()
-        stale = [a for a in data if a["name"] == "stale-agent"][0]
-        assert stale["status"] == "offline"
-
-    def test_fresh_agent_stays_online(self, client):
-        """Agent with recent heartbeat should remain online."""
-        client.post("/api/agents/register", json={
-            "name": "fresh-agent", "role": "backend", "status": "online"
-        })
-        resp = client.get("/api/agents")
-        data = resp.get_json()
-        fresh = [a for a in data if a["name"] == "fresh-agent"][0]
-        assert fresh["status"] == "online"
+    @pytest.mark.parametrize("idle_seconds,expected_status", [
+        (120, "offline"),
+        (0, "online"),
+    ], ids=["stale-marked-offline", "fresh-stays-online"])
+    def test_agent_status_after_idle(self, client, register_agent,
+                                     idle_seconds, expected_status):
+        """Agents idle past the heartbeat timeout should be marked offline."""
+        with freeze_time() as frozen:
+            register_agent("kat")
+            frozen.tick(timedelta(seconds=idle_seconds))
+            resp = client.get("/api/agents")
+        data = _json(resp)
+        agent = next(a for a in data if a["name"] == "kat")
+        assert agent["status"] == expected_status
+
+    def test_timeout_sweep_throttled(self, app, client, monkeypatch):
+        """The offline sweep should run at most once per half timeout."""
+        monkeypatch.setitem(app.config, "AGENT_HEARTBEAT_TIMEOUT", 60)
+        with patch("models.check_heartbeat_timeouts") as mock_check:
+            client.get("/api/agents")
+            client.get("/api/agents")
+            assert mock_check.call_count == 1
+            with patch("app.time.monotonic", return_value=time.monotonic() + 31):
+                client.get("/api/agents")
+            assert mock_check.call_count == 2
 
 
 # --- GET /api/agents/<id>/working ---
 
 class TestWorkingEndpoint:
-    def _register(self, client, name="Kat"):
-        resp = client.post("/api/agents/register", json={
-            "name": name, "role": "backend", "status": "online"
+    @pytest.fixture(scope="class")
+    def agents_base(self, tmp_path_factory):
+        return _seed_agents_base(tmp_path_factory, {
+            "kat": "## Current Task\nWorking on issue #7\n",
+            "sam": "Sam's work log",
         })
-        return resp.get_json()
 
-    def test_working_returns_file_content(self, app, client, tmp_path):
+    def test_working_returns_file_content(self, app, client, agents_base,
+                                          register_agent, monkeypatch):
         """Should return WORKING.md content for a registered agent."""
-        agent = self._register(client, "Kat")
-
-        # Create a fake WORKING.md
-        agent_dir = tmp_path / "kat"
-        agent_dir.mkdir()
-        working_file = agent_dir / "WORKING.md"
-        working_file.write_text("## Current Task\nWorking on issue #7\n")
-
-        app.config["AGENTS_BASE_PATH"] = str(tmp_path)
+        agent = register_agent("Kat")
+        monkeypatch.setitem(app.config, "AGENTS_BASE_PATH", str(agents_base))
 
         resp = client.get(f"/api/agents/{agent['id']}/working")
         assert resp.status_code == 200
-        data = resp.get_json()
+        data = _json(resp)
         assert "content" in data
         assert "Working on issue #7" in data["content"]
         assert data["agent_name"] == "Kat"
 
+    def test_working_serves_raw_markdown(self, app, client, agents_base,
+                                         register_agent, monkeypatch):
+        """Should send the file itself when markdown is requested."""
+        agent = register_agent("Kat")
+        monkeypatch.setitem(app.config, "AGENTS_BASE_PATH", str(agents_base))
+        url = f"/api/agents/{agent['id']}/working"
+
+        resp = client.get(url, headers={"Accept": "text/markdown"})
+        assert resp.status_code == 200
+        assert resp.mimetype == "text/markdown"
+        assert resp.get_data(as_text=True) == (
+            "## Current Task\nWorking on issue #7\n")
+
+        resp = client.get(url, headers={"Accept": "text/markdown",
+                                        "If-None-Match": resp.headers["ETag"]})
+        assert resp.status_code == 304
+
     def test_working_nonexistent_agent_returns_404(self, client):
         """Should return 404 for unknown agent ID."""
         resp = client.get("/api/agents/9999/working")
         assert resp.status_code == 404
-        data = resp.get_json()
+        data = _json(resp)
         assert "error" in data
 
-    def test_working_missing_file_returns_404(self, app, client, tmp_path):
+    def test_working_missing_file_returns_404(self, app, client, agents_base,
+                                              register_agent, monkeypatch):
         """Should return 404 if WORKING.md doesn't exist for the agent."""
-        agent = self._register(client, "Kat")
-        app.config["AGENTS_BASE_PATH"] = str(tmp_path)
+        agent = register_agent("Dan")
+        monkeypatch.setitem(app.config, "AGENTS_BASE_PATH", str(agents_base))
 
         resp = client.get(f"/api/agents/{agent['id']}/working")
         assert resp.status_code == 404
-        data = resp.get_json()
+        data = _json(resp)
         assert "error" in data
 
-    def test_working_uses_lowercase_agent_name(self, app, client, tmp_path):
+    def test_working_uses_lowercase_agent_name(self, app, client, agents_base,
+                                               register_agent, monkeypatch):
         """Should map agent name to lowercase directory."""
-        agent = self._register(client, "Sam")
-
-        agent_dir = tmp_path / "sam"
-        agent_dir.mkdir()
-        (agent_dir / "WORKING.md").write_text("Sam's work log")
-
-        app.config["AGENTS_BASE_PATH"] = str(tmp_path)
+        agent = register_agent("Sam")
+        monkeypatch.setitem(app.config, "AGENTS_BASE_PATH", str(agents_base))
 
         resp = client.get(f"/api/agents/{agent['id']}/working")
         assert resp.status_code == 200
-        data = resp.get_json()
+        data = _json(resp)
         assert data["content"] == "Sam's work log"
         assert data["agent_name"] == "Sam"
 
 
 # --- GET /api/agents/<name>/terminal ---
 
+@pytest.mark.terminal
 class TestTerminalEndpoint:
-    def test_terminal_returns_tmux_output(self, client):
+    def test_terminal_returns_tmux_output(self, client, subprocess_mock):
         """Should return captured tmux pane output."""
-        mock_result = MagicMock()
-        mock_result.returncode = 0
-        mock_result.stdout = "$ python app.py\nRunning on port 5000\n"
-
-        with patch("app.subprocess.run", return_value=mock_result) as mock_run:
-            resp = client.get("/api/agents/sam/terminal")
-            assert resp.status_code == 200
-            data = resp.get_json()
-            assert data["name"] == "sam"
-            assert "Running on port 5000" in data["output"]
-            mock_run.assert_called_once_with(
-                ["tmux", "capture-pane", "-p", "-t", "sam", "-S", "-30"],
-                capture_output=True, text=True, timeout=5
-            )
-
-    def test_terminal_session_not_found(self, client):
+        mock_result = _completed(stdout="$ python app.py\nRunning on port 5000\n")
+
+        subprocess_mock.return_value = mock_result
+        resp = client.get("/api/agents/sam/terminal")
+        assert resp.status_code == 200
+        data = _json(resp)
+        assert data["name"] == "sam"
+        assert "Running on port 5000" in data["output"]
+        subprocess_mock.assert_called_once_with(
+            ["tmux", "capture-pane", "-p", "-t", "sam", "-S", "-30"],
+            capture_output=True, text=True, timeout=5
+        )
+
+    def test_terminal_session_not_found(self, client, subprocess_mock):
         """Should return 404 when tmux session doesn't exist."""
-        mock_result = MagicMock()
-        mock_result.returncode = 1
-        mock_result.stderr = "can't find session: noagent"
+        mock_result = _completed(returncode=1,
+                                 stderr="can't find session: noagent")
 
-        with patch("app.subprocess.run", return_value=mock_result):
-            resp = client.get("/api/agents/noagent/terminal")
-            assert resp.status_code == 404
-            data = resp.get_json()
-            assert "error" in data
+        subprocess_mock.return_value = mock_result
+        resp = client.get("/api/agents/noagent/terminal")
+        assert resp.status_code == 404
+        data = _json(resp)
+        assert "error" in data
 
     def test_terminal_invalid_name_returns_400(self, client):
         """Should reject names with special characters."""
         resp = client.get("/api/agents/$(whoami)/terminal")
         assert resp.status_code == 400
 
-    def test_terminal_tmux_not_installed(self, client):
+    def test_terminal_tmux_not_installed(self, client, subprocess_mock):
         """Should return 500 when tmux is not available."""
-        with patch("app.subprocess.run", side_effect=FileNotFoundError):
-            resp = client.get("/api/agents/sam/terminal")
-            assert resp.status_code == 500
-            data = resp.get_json()
-            assert "tmux is not installed" in data["error"]
+        subprocess_mock.side_effect = FileNotFoundError
+        resp = client.get("/api/agents/sam/terminal")
+        assert resp.status_code == 500
+        data = _json(resp)
+        assert "tmux is not installed" in data["error"]
 
-    def test_terminal_tmux_timeout(self, client):
+    def test_terminal_tmux_timeout(self, client, subprocess_mock):
         """Should return 500 when tmux command hangs."""
-        import subprocess
-        with patch("app.subprocess.run",
-                   side_effect=subprocess.TimeoutExpired(cmd="tmux", timeout=5)):
-            resp = client.get("/api/agents/sam/terminal")
-            assert resp.status_code == 500
-            data = resp.get_json()
-            assert "timed out" in data["error"]
+        subprocess_mock.side_effect = subprocess.TimeoutExpired(cmd="tmux", timeout=5)
+        resp = client.get("/api/agents/sam/terminal")
+        assert resp.status_code == 500
+        data = _json(resp)
+        assert "timed out" in data["error"]
+
+    def test_terminal_capture_cached_briefly(self, client, subprocess_mock):
+        """Back-to-back polls of one session should share a tmux call."""
+        mock_result = _completed(stdout="$ ls\n")
+        subprocess_mock.return_value = mock_result
+        client.get("/api/agents/sam/terminal")
+        resp = client.get("/api/agents/sam/terminal")
+        assert _json(resp)["output"] == "$ ls\n"
+        assert subprocess_mock.call_count == 1
+
+    def test_terminal_cache_expires(self, app, client, subprocess_mock,
+                                    monkeypatch):
+        monkeypatch.setitem(app.config, "TERMINAL_CACHE_TTL", 0)
+        mock_result = _completed(stdout="$ ls\n")
+        subprocess_mock.return_value = mock_result
+        client.get("/api/agents/sam/terminal")
+        client.get("/api/agents/sam/terminal")
+        assert subprocess_mock.call_count == 2
+
+
+@pytest.mark.terminal
+class TestTerminalsBatchEndpoint:
+    def test_terminals_captures_each_session(self, client, subprocess_mock):
+        def fake_run(cmd, **kwargs):
+            name = cmd[cmd.index("-t") + 1]
+            if name == "ghost":
+                return _completed(returncode=1, stderr="can't find session")
+            return _completed(stdout=f"{name}$ \n")
+
+        subprocess_mock.side_effect = fake_run
+        resp = client.get("/api/agents/terminals?names=sam,kat,ghost")
+        assert resp.status_code == 200
+        data = _json(resp)
+        assert data["sam"]["output"] == "sam$ \n"
+        assert data["kat"]["output"] == "kat$ \n"
+        assert data["ghost"]["status"] == 404
+        assert "error" in data["ghost"]
+
+    def test_terminals_flags_invalid_names(self, client, subprocess_mock):
+        mock_result = _completed()
+        subprocess_mock.return_value = mock_result
+        resp = client.get("/api/agents/terminals?names=sam,$(whoami)")
+        data = _json(resp)
+        assert data["$(whoami)"]["status"] == 400
+        assert subprocess_mock.call_count == 1
+
+    def test_terminals_rejects_too_many_names(self, client, subprocess_mock):
+        names = ",".join(f"agent{i}" for i in range(33))
+        resp = client.get(f"/api/agents/terminals?names={names}")
+        assert resp.status_code == 400
+        assert subprocess_mock.call_count == 0
+
+    def test_terminals_requires_names(self, client):
+        resp = client.get("/api/agents/terminals")
+        assert resp.status_code == 400
 
 
 # --- GET /api/heartbeat/status ---
 
 class TestHeartbeatStatus:
-    def test_status_returns_active_true_when_on(self, app, client, tmp_path):
+    @pytest.mark.parametrize("content,expected_active", [
+        ("on\n", True),
+        ("off\n", False),
+        (None, False),
+    ], ids=["on", "off", "missing-file"])
+    def test_status(self, app, client, tmp_path, content, expected_active,
+                    monkeypatch):
         hb_file = tmp_path / ".heartbeat-active"
-        hb_file.write_text("on\n")
-        app.config["HEARTBEAT_FILE"] = str(hb_file)
+        if content is not None:
+            hb_file.write_text(content)
+        monkeypatch.setitem(app.config, "HEARTBEAT_FILE", str(hb_file))
 
         resp = client.get("/api/heartbeat/status")
         assert resp.status_code == 200
-        data = resp.get_json()
-        assert data["active"] is True
+        data = _json(resp)
+        assert data["active"] is expected_active
 
-    def test_status_returns_active_false_when_off(self, app, client, tmp_path):
+    def test_status_rereads_only_when_file_changes(self, app, client, tmp_path,
+                                                   monkeypatch):
         hb_file = tmp_path / ".heartbeat-active"
-        hb_file.write_text("off\n")
-        app.config["HEARTBEAT_FILE"] = str(hb_file)
-
-        resp = client.get("/api/heartbeat/status")
-        assert resp.status_code == 200
-        data = resp.get_json()
-        assert data["active"] is False
+        hb_file.write_text("on\n")
+        monkeypatch.setitem(app.config, "HEARTBEAT_FILE", str(hb_file))
 
-    def test_status_returns_false_when_file_missing(self, app, client, tmp_path):
-        app.config["HEARTBEAT_FILE"] = str(tmp_path / "nonexistent")
+        with patch("app.Path.read_text", autospec=True,
+                   side_effect=lambda p: open(p).read()) as mock_read:
+            client.get("/api/heartbeat/status")
+            client.get("/api/heartbeat/status")
+            assert mock_read.call_count == 1
 
-        resp = client.get("/api/heartbeat/status")
-        assert resp.status_code == 200
-        data = resp.get_json()
-        assert data["active"] is False
+            hb_file.write_text("off\n")
+            resp = client.get("/api/heartbeat/status")
+            assert _json(resp)["active"] is False
+            assert mock_read.call_count == 2
 
 
 # --- POST /api/heartbeat/toggle ---
 
 class TestHeartbeatToggle:
-    def test_toggle_flips_on_to_off(self, app, client, tmp_path):
-        hb_file = tmp_path / ".heartbeat-active"
-        hb_file.write_text("on\n")
-        app.config["HEARTBEAT_FILE"] = str(hb_file)
-
-        resp = client.post("/api/heartbeat/toggle",
-                           headers={"X-API-Key": "test-admin-key"})
-        assert resp.status_code == 200
-        data = resp.get_json()
-        assert data["active"] is False
-        assert hb_file.read_text().strip() == "off"
-
-    def test_toggle_flips_off_to_on(self, app, client, tmp_path):
-        hb_file = tmp_path / ".heartbeat-active"
-        hb_file.write_text("off\n")
-        app.config["HEARTBEAT_FILE"] = str(hb_file)
-
-        resp = client.post("/api/heartbeat/toggle",
-                           headers={"X-API-Key": "test-admin-key"})
-        assert resp.status_code == 200
-        data = resp.get_json()
-        assert data["active"] is True
-        assert hb_file.read_text().strip() == "on"
-
-    def test_toggle_creates_file_when_missing(self, app, client, tmp_path):
+    @pytest.mark.parametrize("initial,expected_active,expected_content", [
+        ("on\n", False, "off"),
+        ("off\n", True, "on"),
+        (None, True, "on"),
+    ], ids=["on-to-off", "off-to-on", "creates-missing-file"])
+    def test_toggle(self, app, client, tmp_path, initial, expected_active,
+                    expected_content, monkeypatch):
         hb_file = tmp_path / ".heartbeat-active"
-        app.config["HEARTBEAT_FILE"] = str(hb_file)
+        if initial is not None:
+            hb_file.write_text(initial)
+        monkeypatch.setitem(app.config, "HEARTBEAT_FILE", str(hb_file))
 
         resp = client.post("/api/heartbeat/toggle",
                            headers={"X-API-Key": "test-admin-key"})
         assert resp.status_code == 200
-        data = resp.get_json()
-        assert data["active"] is True
-        assert hb_file.read_text().strip() == "on"
+        data = _json(resp)
+        assert data["active"] is expected_active
+        assert hb_file.read_text().strip() == expected_content
 
 
 class TestHeartbeatToggleAuth:
-    def test_toggle_requires_api_key(self, app, client, tmp_path):
-        """Toggle should reject requests without valid API key."""
-        hb_file = tmp_path / ".heartbeat-active"
-        hb_file.write_text("off\n")
-        app.config["HEARTBEAT_FILE"] = str(hb_file)
-        app.config["DASHBOARD_API_KEY"] = "secret-key"
-
-        resp = client.post("/api/heartbeat/toggle")
-        assert resp.status_code == 403
-
-    def test_toggle_accepts_valid_api_key_header(self, app, client, tmp_path):
-        """Toggle should work with valid X-API-Key header."""
+    @pytest.mark.parametrize("configured_key,headers,expected_status", [
+        ("secret-key", {}, 403),
+        ("secret-key", {"X-API-Key": "secret-key"}, 200),
+        ("secret-key", {"X-API-Key": "wrong-key"}, 403),
+        ("", {}, 200),
+    ], ids=["missing-key", "valid-key", "wrong-key", "no-key-configured"])
+    def test_toggle_api_key(self, app, client, tmp_path, configured_key,
+                            headers, expected_status, monkeypatch):
+        """Toggle requires X-API-Key only when DASHBOARD_API_KEY is set."""
         hb_file = tmp_path / ".heartbeat-active"
         hb_file.write_text("off\n")
-        app.config["HEARTBEAT_FILE"] = str(hb_file)
-        app.config["DASHBOARD_API_KEY"] = "secret-key"
+        monkeypatch.setitem(app.config, "HEARTBEAT_FILE", str(hb_file))
+        monkeypatch.setitem(app.config, "DASHBOARD_API_KEY", configured_key)
 
-        resp = client.post("/api/heartbeat/toggle",
-                           headers={"X-API-Key": "secret-key"})
-        assert resp.status_code == 200
-        data = resp.get_json()
-        assert data["active"] is True
-
-    def test_toggle_rejects_wrong_api_key(self, app, client, tmp_path):
-        """Toggle should reject incorrect API key."""
-        hb_file = tmp_path / ".heartbeat-active"
-        hb_file.write_text("off\n")
-        app.config["HEARTBEAT_FILE"] = str(hb_file)
-        app.config["DASHBOARD_API_KEY"] = "secret-key"
-
-        resp = client.post("/api/heartbeat/toggle",
-                           headers={"X-API-Key": "wrong-key"})
-        assert resp.status_code == 403
-
-    def test_toggle_works_without_key_configured(self, app, client, tmp_path):
-        """When no DASHBOARD_API_KEY is set, toggle should work without auth."""
-        hb_file = tmp_path / ".heartbeat-active"
-        hb_file.write_text("off\n")
-        app.config["HEARTBEAT_FILE"] = str(hb_file)
-        app.config["DASHBOARD_API_KEY"] = ""
-
-        resp = client.post("/api/heartbeat/toggle")
-        assert resp.status_code == 200
+        resp = client.post("/api/heartbeat/toggle", headers=headers)
+        assert resp.status_code == expected_status
+        if expected_status == 200:
+            assert _json(resp)["active"] is True
+            assert hb_file.read_text().strip() == "on"
+        else:
+            assert hb_file.read_text().strip() == "off"
 
 
 # --- GET /api/activity ---
 
 class TestActivityFeed:
-    def test_activity_returns_git_commits(self, app, client):
+    def test_activity_returns_git_commits(self, app, client, monkeypatch,
+                                          subprocess_mock):
         # Disable Slack so real messages don't crowd out mock commits
-        app.config["SLACK_BOT_TOKEN"] = ""
-        app.config["SLACK_CHANNELS"] = []
+        monkeypatch.setitem(app.config, "SLACK_BOT_TOKEN", "")
+        monkeypatch.setitem(app.config, "SLACK_CHANNELS", [])
 
-        mock_result = MagicMock()
-        mock_result.returncode = 0
-        mock_result.stdout = (
+        mock_result = _completed(stdout=(
             "abc1234||Dan||Initial commit||2025-01-15T10:00:00+00:00\n"
             "def5678||Kat||Add models||2025-01-15T09:00:00+00:00\n"
-        )
+        ))
 
-        with patch("subprocess.run", return_value=mock_result):
-            resp = client.get("/api/activity")
-            assert resp.status_code == 200
-            data = resp.get_json()
-            commits = [e for e in data if e["type"] == "commit"]
-            assert len(commits) == 2
-            assert "abc1234" in commits[0]["message"]
-            assert commits[0]["agent"] == "Dan"
-
-    def test_activity_returns_heartbeat_events(self, app, client):
-        # Register an agent first
-        client.post("/api/agents/register", json={
-            "name": "kat", "role": "backend", "status": "online"
-        })
+        subprocess_mock.return_value = mock_result
+        resp = client.get("/api/activity")
+        assert resp.status_code == 200
+        data = _json(resp)
+        commits = [e for e in data if e["type"] == "commit"]
+        assert len(commits) == 2
+        assert "abc1234" in commits[0]["message"]
+        assert commits[0]["agent"] == "Dan"
+
+    def test_activity_returns_heartbeat_events(self, client, kat_agent):
+        resp = client.get("/api/activity")
+        assert resp.status_code == 200
+        data = _json(resp)
+        heartbeats = [e for e in data if e["type"] == "heartbeat"]
+        assert len(heartbeats) >= 1
+        assert heartbeats[0]["agent"] == "kat"
 
-        with patch("app.subprocess.run") as mock_run:
-            mock_run.return_value = MagicMock(returncode=1, stdout="")
-            resp = client.get("/api/activity")
-            assert resp.status_code == 200
-            data = resp.get_json()
-            heartbeats = [e for e in data if e["type"] == "heartbeat"]
-            assert len(heartbeats) >= 1
-            assert heartbeats[0]["agent"] == "kat"
-
-    def test_activity_sorted_by_timestamp_desc(self, app, client):
-        mock_result = MagicMock()
-        mock_result.returncode = 0
-        mock_result.stdout = (
+    def test_activity_sorted_by_timestamp_desc(self, app, client, subprocess_mock):
+        mock_result = _completed(stdout=(
             "aaa1111||Dan||Older commit||2025-01-10T08:00:00+00:00\n"
             "bbb2222||Kat||Newer commit||2025-01-15T12:00:00+00:00\n"
+        ))
+
+        subprocess_mock.return_value = mock_result
+        resp = client.get("/api/activity")
+        assert resp.status_code == 200
+        data = _json(resp)
+        if len(data) >= 2:
+            assert data[0]["timestamp"] >= data[1]["timestamp"]
+
+    def test_activity_merges_sources_newest_first(self, client, kat_agent,
+                                                  subprocess_mock):
+        """Heartbeats should interleave with commits by timestamp."""
+        mock_result = _completed(stdout=(
+            "aaa1111||Dan||Old commit||2000-01-10T08:00:00+00:00\n"
+            "bbb2222||Kat||Future commit||2999-01-15T12:00:00+00:00\n"
+        ))
+        subprocess_mock.return_value = mock_result
+        data = _json(client.get("/api/activity"))
+        assert [e["type"] for e in data] == ["commit", "heartbeat", "commit"]
+        assert data[0]["message"] == "bbb2222 Future commit"
+
+    def test_git_log_cached_until_head_moves(self, app, client, tmp_path,
+                                             subprocess_mock, monkeypatch):
+        """git log should only re-run when the branch ref changes."""
+        git_dir = tmp_path / "repo" / ".git"
+        (git_dir / "refs" / "heads").mkdir(parents=True)
+        (git_dir / "HEAD").write_text("ref: refs/heads/main\n")
+        ref = git_dir / "refs" / "heads" / "main"
+        ref.write_text("1111111111111111111111111111111111111111\n")
+        monkeypatch.setitem(app.config, "PROJECT_DIR", str(tmp_path / "repo"))
+        monkeypatch.setitem(app.config, "ACTIVITY_CACHE_TTL", 0)
+
+        mock_result = _completed(
+            stdout="abc1234||Dan||Commit||2025-01-15T10:00:00+00:00\n",
         )
+        subprocess_mock.return_value = mock_result
+        client.get("/api/activity")
+        client.get("/api/activity")
+        assert subprocess_mock.call_count == 1
 
-        with patch("app.subprocess.run", return_value=mock_result):
-            resp = client.get("/api/activity")
-            assert resp.status_code == 200
-            data = resp.get_json()
-            if len(data) >= 2:
-                assert data[0]["timestamp"] >= data[1]["timestamp"]
+        ref.write_text("2222222222222222222222222222222222222222\n")
+        client.get("/api/activity")
+        assert subprocess_mock.call_count == 2
 
-    def test_activity_handles_git_failure(self, app, client):
+    def test_activity_handles_git_failure(self, app, client, subprocess_mock):
         """Should return events even if git fails."""
-        with patch("app.subprocess.run",
-                   side_effect=FileNotFoundError):
-            resp = client.get("/api/activity")
-            assert resp.status_code == 200
-
-    def test_activity_returns_max_20(self, app, client):
-        lines = ""
-        for i in range(25):
-            lines += f"abc{i:04d}||Dan||Commit {i}||2025-01-{15 - (i % 15):02d}T10:00:00+00:00\n"
-        mock_result = MagicMock()
-        mock_result.returncode = 0
-        mock_result.stdout = lines
-
-        with patch("app.subprocess.run", return_value=mock_result):
-            resp = client.get("/api/activity")
-            assert resp.status_code == 200
-            data = resp.get_json()
-            assert len(data) <= 20
+        subprocess_mock.side_effect = FileNotFoundError
+        resp = client.get("/api/activity")
+        assert resp.status_code == 200
+
+    def test_activity_returns_max_20(self, app, client, subprocess_mock):
+        mock_result = _completed(stdout=_25_COMMITS_STDOUT)
+
+        subprocess_mock.return_value = mock_result
+        resp = client.get("/api/activity")
+        assert resp.status_code == 200
+        data = _json(resp)
+        assert len(data) <= 20
+
+    def test_activity_served_from_cache_within_ttl(self, app, client,
+                                                   subprocess_mock):
+        """A second fetch inside the TTL should not re-run git."""
+        client.get("/api/activity")
+        client.get("/api/activity")
+        assert subprocess_mock.call_count == 1
+
+    def test_activity_returns_304_for_matching_etag(self, app, client):
+        first = client.get("/api/activity")
+        etag = first.headers["ETag"]
+        resp = client.get("/api/activity",
+                          headers={"If-None-Match": etag})
+        assert resp.status_code == 304
+
+    def test_register_invalidates_activity_cache(self, app, client):
+        client.get("/api/activity")
+        client.post("/api/agents/register", data=_REGISTER_KAT_BODY,
+                    content_type="application/json")
+        data = _json(client.get("/api/activity"))
+        assert any(e["agent"] == "kat" for e in data)
+
+    def test_write_during_recompute_is_not_cached(self, app, client,
+                                                  subprocess_mock,
+                                                  monkeypatch):
+        """A register landing mid-recompute must show up on the next GET."""
+        heartbeats_read = threading.Event()
+        real_get_all_agents = models.get_all_agents
+
+        def get_all_agents(conn):
+            try:
+                return real_get_all_agents(conn)
+            finally:
+                heartbeats_read.set()
+
+        def slow_git_log(*args, **kwargs):
+            # Register only after this recompute has read the agents table
+            heartbeats_read.wait(timeout=2)
+            app.test_client().post("/api/agents/register",
+                                   data=_REGISTER_KAT_BODY,
+                                   content_type="application/json")
+            return _completed()
+
+        monkeypatch.setattr("models.get_all_agents", get_all_agents)
+        subprocess_mock.side_effect = slow_git_log
+
+        assert _json(client.get("/api/activity")) == []
+        data = _json(client.get("/api/activity"))
+        assert any(e["agent"] == "kat" for e in data)
+
+    def test_timed_out_sources_are_not_cached(self, client, subprocess_mock,
+                                              monkeypatch):
+        """A feed missing a late source should be rebuilt on the next GET."""
+        monkeypatch.setattr("app.ACTIVITY_FETCH_DEADLINE", 0.05)
+        release = threading.Event()
+
+        def slow_git_log(*args, **kwargs):
+            release.wait(timeout=2)
+            return _completed(
+                stdout="abc1234||Dan||Late commit||2025-01-15T10:00:00+00:00\n")
+
+        subprocess_mock.side_effect = slow_git_log
+
+        assert _json(client.get("/api/activity")) == []
+        release.set()
+        data = _json(client.get("/api/activity"))
+        assert [e["agent"] for e in data] == ["Dan"]
+
+    @pytest.fixture
+    def activity_stream(self, app, monkeypatch):
+        """Turn on the SSE endpoint for this test."""
+        monkeypatch.setitem(app.config, "ACTIVITY_STREAM_ENABLED", True)
+
+    def test_activity_stream_disabled_falls_back_to_polling(self, client,
+                                                           kat_agent):
+        """With streaming off the page polls, and the stream 404s."""
+        assert b'data-stream="true"' not in client.get("/").data
+        resp = client.get("/api/activity/stream")
+        assert resp.status_code == 404
+        data = _json(client.get("/api/activity"))
+        assert [e["agent"] for e in data] == ["kat"]
+
+    def test_activity_stream_enabled_is_advertised(self, client,
+                                                   activity_stream):
+        assert b'data-stream="true"' in client.get("/").data
+
+    def test_activity_stream_sends_initial_feed(self, client,
+                                                activity_stream):
+        resp = client.get("/api/activity/stream", buffered=False)
+        assert resp.mimetype == "text/event-stream"
+        assert resp.headers["X-Accel-Buffering"] == "no"
+        chunk = next(resp.response)
+        resp.close()
+        assert chunk.startswith(b"event: activity\ndata: ")
+        assert json.loads(chunk.split(b"data: ", 1)[1]) == []
+
+    def test_activity_stream_pushes_after_register(self, client,
+                                                   activity_stream):
+        """A registration should wake the stream with the updated feed."""
+        resp = client.get("/api/activity/stream", buffered=False)
+        stream = iter(resp.response)
+        next(stream)
+        client.post("/api/agents/register", data=_REGISTER_KAT_BODY,
+                    content_type="application/json")
+        chunk = next(stream)
+        resp.close()
+        events = json.loads(chunk.split(b"data: ", 1)[1])
+        assert any(e["agent"] == "kat" for e in events)
+
+    def test_activity_stream_ends_after_max_age(self, app, client,
+                                                activity_stream, monkeypatch):
+        """The stream should close with a retry hint instead of running forever."""
+        monkeypatch.setitem(app.config, "ACTIVITY_STREAM_MAX_AGE", 0)
+        resp = client.get("/api/activity/stream", buffered=False)
+        chunks = list(resp.response)
+        resp.close()
+        assert chunks[0].startswith(b"event: activity\n")
+        assert chunks[-1] == b"retry: 1000\n\n"
+        assert len(chunks) == 2
+
+    def test_activity_uses_polled_sources(self, app, client, subprocess_mock,
+                                          monkeypatch):
+        """With a fresh poller snapshot, requests don't run git themselves."""
+        monkeypatch.setitem(app.config, "ACTIVITY_CACHE_TTL", 0)
+        mock_result = _completed(
+            stdout="abc1234||Dan||Polled commit||2025-01-15T10:00:00+00:00\n",
+        )
+        subprocess_mock.return_value = mock_result
+        app.extensions["refresh_activity_sources"]()
+        assert subprocess_mock.call_count == 1
+        data = _json(client.get("/api/activity"))
+        assert subprocess_mock.call_count == 1
+        assert [e["message"] for e in data] == ["abc1234 Polled commit"]
+
+    def test_activity_falls_back_when_poll_snapshot_stale(self, app, client,
+                                                          subprocess_mock,
+                                                          monkeypatch):
+        monkeypatch.setitem(app.config, "ACTIVITY_CACHE_TTL", 0)
+        app.extensions["refresh_activity_sources"]()
+        with patch("app.time.time", return_value=time.time() + 3600):
+            client.get("/api/activity")
+        assert subprocess_mock.call_count == 2
+
+    @pytest.mark.slack
+    def test_activity_fetches_every_slack_channel(self, app, client,
+                                                  monkeypatch, slack_api):
+        """Each configured channel should contribute its messages."""
+        monkeypatch.setitem(app.config, "SLACK_CHANNELS", ["C111", "C222"])
+
+        def history(url):
+            channel = url.split("channel=")[1].split("&")[0]
+            return _slack_history_resp([
+                {"user": "U0GGG", "text": f"hi from {channel}",
+                 "ts": "1705312800.000"}
+            ])
+
+        slack_api["conversations.history"] = history
+        data = _json(client.get("/api/activity"))
+        texts = sorted(e["message"] for e in data if e["type"] == "slack")
+        assert texts == ["hi from C111", "hi from C222"]
 
 
 # --- Slack user ID resolution ---
 
+@pytest.mark.slack
 class TestSlackUserResolution:
-    def _make_slack_response(self, messages):
-        """Build a mock urlopen context manager returning Slack messages."""
-        slack_resp = json.dumps({
-            "ok": True,
-            "messages": messages,
-        }).encode()
-        mock_resp = MagicMock()
-        mock_resp.read.return_value = slack_resp
-        mock_resp.__enter__ = lambda s: s
-        mock_resp.__exit__ = MagicMock(return_value=False)
-        return mock_resp
-
     def _make_user_info_response(self, display_name="", real_name=""):
-        """Build a mock urlopen context manager returning users.info data."""
-        user_resp = json.dumps({
-            "ok": True,
-            "user": {
-                "real_name": real_name,
-                "profile": {"display_name": display_name},
-            },
-        }).encode()
-        mock_resp = MagicMock()
-        mock_resp.read.return_value = user_resp
-        mock_resp.__enter__ = lambda s: s
-        mock_resp.__exit__ = MagicMock(return_value=False)
-        return mock_resp
-
-    def test_resolves_user_id_to_display_name(self, app, client):
-        """Slack events should show display_name instead of raw user ID."""
-        app.config["SLACK_BOT_TOKEN"] = "xoxb-test"
-        app.config["SLACK_CHANNELS"] = ["C123"]
+        """Build a fake Slack HTTP response returning users.info data."""
+        return FakeResponse(_user_info_bytes(display_name, real_name))
 
-        slack_history = self._make_slack_response([
+    def _slack_events(self, client):
+        data = _json(client.get("/api/activity"))
+        return [e for e in data if e["type"] == "slack"]
+
+    def test_resolves_user_id_to_display_name(self, client, slack_api):
+        """Slack events should show display_name instead of raw user ID."""
+        slack_api["conversations.history"] = _slack_history_resp([
             {"user": "U0AAA5ZK6EB", "text": "hello", "ts": "1705312800.000"}
         ])
-        user_info = self._make_user_info_response(display_name="Alice")
-
-        def urlopen_side_effect(req, **kwargs):
-            url = req.full_url if hasattr(req, 'full_url') else req.get_full_url()
-            if "users.info" in url:
-                return user_info
-            return slack_history
-
-        with patch("app.subprocess.run",
-                   return_value=MagicMock(returncode=1, stdout="")):
-            with patch("urllib.request.urlopen",
-                       side_effect=urlopen_side_effect):
-                resp = client.get("/api/activity")
-                data = resp.get_json()
-                slack_events = [e for e in data if e["type"] == "slack"]
-                assert len(slack_events) == 1
-                assert slack_events[0]["agent"] == "Alice"
-
-    def test_falls_back_to_real_name(self, app, client):
-        """Should use real_name when display_name is empty."""
-        app.config["SLACK_BOT_TOKEN"] = "xoxb-test"
-        app.config["SLACK_CHANNELS"] = ["C123"]
+        slack_api["users.info"] = self._make_user_info_response(display_name="Alice")
+
+        slack_events = self._slack_events(client)
+        assert len(slack_events) == 1
+        assert slack_events[0]["agent"] == "Alice"
 
-        slack_history = self._make_slack_response([
+    def test_falls_back_to_real_name(self, client, slack_api):
+        """Should use real_name when display_name is empty."""
+        slack_api["conversations.history"] = _slack_history_resp([
             {"user": "U0BBB", "text": "hi", "ts": "1705312800.000"}
         ])
-        user_info = self._make_user_info_response(display_name="", real_name="Bob Smith")
-
-        def urlopen_side_effect(req, **kwargs):
-            url = req.full_url if hasattr(req, 'full_url') else req.get_full_url()
-            if "users.info" in url:
-                return user_info
-            return slack_history
-
-        with patch("app.subprocess.run",
-                   return_value=MagicMock(returncode=1, stdout="")):
-            with patch("urllib.request.urlopen",
-                       side_effect=urlopen_side_effect):
-                resp = client.get("/api/activity")
-                data = resp.get_json()
-                slack_events = [e for e in data if e["type"] == "slack"]
-                assert slack_events[0]["agent"] == "Bob Smith"
-
-    def test_falls_back_to_raw_id_on_api_failure(self, app, client):
-        """Should use raw user ID if users.info API fails."""
-        app.config["SLACK_BOT_TOKEN"] = "xoxb-test"
-        app.config["SLACK_CHANNELS"] = ["C123"]
+        slack_api["users.info"] = self._make_user_info_response(
+            display_name="", real_name="Bob Smith")
 
-        slack_history = self._make_slack_response([
+        assert self._slack_events(client)[0]["agent"] == "Bob Smith"
+
+    def test_falls_back_to_raw_id_on_api_failure(self, client, slack_api):
+        """Should use raw user ID if users.info API fails."""
+        slack_api["conversations.history"] = _slack_history_resp([
             {"user": "U0CCC", "text": "hey", "ts": "1705312800.000"}
         ])
+        slack_api["users.info"] = requests.ConnectionError("network error")
 
-        call_count = [0]
+        assert self._slack_events(client)[0]["agent"] == "U0CCC"
 
-        def urlopen_side_effect(req, **kwargs):
-            url = req.full_url if hasattr(req, 'full_url') else req.get_full_url()
-            if "users.info" in url:
-                import urllib.error
-                raise urllib.error.URLError("network error")
-            return slack_history
-
-        with patch("app.subprocess.run",
-                   return_value=MagicMock(returncode=1, stdout="")):
-            with patch("urllib.request.urlopen",
-                       side_effect=urlopen_side_effect):
-                resp = client.get("/api/activity")
-                data = resp.get_json()
-                slack_events = [e for e in data if e["type"] == "slack"]
-                assert slack_events[0]["agent"] == "U0CCC"
-
-    def test_caches_resolved_users(self, app, client):
+    def test_caches_resolved_users(self, client, slack_api):
         """Should only call users.info once per unique user ID."""
-        app.config["SLACK_BOT_TOKEN"] = "xoxb-test"
-        app.config["SLACK_CHANNELS"] = ["C123"]
-
-        slack_history = self._make_slack_response([
+        slack_api["conversations.history"] = _slack_history_resp([
             {"user": "U0DDD", "text": "msg1", "ts": "1705312800.000"},
             {"user": "U0DDD", "text": "msg2", "ts": "1705312801.000"},
         ])
-        user_info = self._make_user_info_response(display_name="Dave")
-
-        urlopen_calls = []
-
-        def urlopen_side_effect(req, **kwargs):
-            url = req.full_url if hasattr(req, 'full_url') else req.get_full_url()
-            urlopen_calls.append(url)
-            if "users.info" in url:
-                return user_info
-            return slack_history
-
-        with patch("app.subprocess.run",
-                   return_value=MagicMock(returncode=1, stdout="")):
-            with patch("urllib.request.urlopen",
-                       side_effect=urlopen_side_effect):
-                resp = client.get("/api/activity")
-                data = resp.get_json()
-                slack_events = [e for e in data if e["type"] == "slack"]
-                assert len(slack_events) == 2
-                assert all(e["agent"] == "Dave" for e in slack_events)
-                # users.info should only be called once (not twice)
-                user_info_calls = [u for u in urlopen_calls if "users.info" in u]
-                assert len(user_info_calls) == 1
-
-    def test_no_resolution_without_token(self, app, client):
+        slack_api["users.info"] = self._make_user_info_response(display_name="Dave")
+
+        slack_events = self._slack_events(client)
+        assert len(slack_events) == 2
+        assert all(e["agent"] == "Dave" for e in slack_events)
+        # users.info should only be called once (not twice)
+        assert len(slack_api.calls("users.info")) == 1
+
+    def test_users_list_prefetch_skips_users_info(self, client, slack_api):
+        """Users found via users.list should not trigger users.info calls."""
+        slack_api["conversations.history"] = _slack_history_resp([
+            {"user": "U0AAA", "text": "one", "ts": "1705312800.000"},
+            {"user": "U0BBB", "text": "two", "ts": "1705312801.000"},
+        ])
+        slack_api["users.list"] = FakeResponse({"ok": True, "members": [
+            {"id": "U0AAA", "real_name": "Alice A",
+             "profile": {"display_name": "Alice"}},
+            {"id": "U0BBB", "real_name": "Bob B",
+             "profile": {"display_name": ""}},
+        ]})
+
+        agents = {e["message"]: e["agent"] for e in self._slack_events(client)}
+        assert agents == {"one": "Alice", "two": "Bob B"}
+        assert not slack_api.calls("users.info")
+
+    def test_users_list_follows_next_cursor(self, client, slack_api):
+        """Members on later users.list pages should resolve without users.info."""
+        slack_api["conversations.history"] = _slack_history_resp([
+            {"user": "U0AAA", "text": "one", "ts": "1705312800.000"},
+            {"user": "U0BBB", "text": "two", "ts": "1705312801.000"},
+        ])
+        pages = {
+            "": {"ok": True, "members": [
+                {"id": "U0AAA", "profile": {"display_name": "Alice"}},
+            ], "response_metadata": {"next_cursor": "dXNlcjpV=="}},
+            "dXNlcjpV%3D%3D": {"ok": True, "members": [
+                {"id": "U0BBB", "profile": {"display_name": "Bob"}},
+            ], "response_metadata": {"next_cursor": ""}},
+        }
+        slack_api["users.list"] = lambda url: FakeResponse(
+            pages[url.partition("&cursor=")[2]])
+
+        agents = {e["message"]: e["agent"] for e in self._slack_events(client)}
+        assert agents == {"one": "Alice", "two": "Bob"}
+        assert len(slack_api.calls("users.list")) == 2
+        assert not slack_api.calls("users.info")
+
+    def test_resolved_users_persist_across_requests(self, app, client,
+                                                    monkeypatch, slack_api):
+        """A second activity fetch should reuse the DB-cached display name."""
+        monkeypatch.setitem(app.config, "ACTIVITY_CACHE_TTL", 0)
+        slack_api["conversations.history"] = _slack_history_resp([
+            {"user": "U0DDD", "text": "msg1", "ts": "1705312800.000"},
+        ])
+        slack_api["users.info"] = self._make_user_info_response(display_name="Dave")
+
+        self._slack_events(client)
+        assert self._slack_events(client)[0]["agent"] == "Dave"
+        assert len(slack_api.calls("users.info")) == 1
+
+    def test_failed_lookup_is_negative_cached(self, app, client, monkeypatch,
+                                              slack_api):
+        """A failed users.info lookup should not be retried on the next fetch."""
+        monkeypatch.setitem(app.config, "ACTIVITY_CACHE_TTL", 0)
+        slack_api["conversations.history"] = _slack_history_resp([
+            {"user": "U0CCC", "text": "hey", "ts": "1705312800.000"}
+        ])
+        slack_api["users.info"] = requests.ConnectionError("user_not_found")
+
+        self._slack_events(client)
+        assert self._slack_events(client)[0]["agent"] == "U0CCC"
+        assert len(slack_api.calls("users.info")) == 1
+
+    def test_no_resolution_without_token(self, app, client, monkeypatch):
         """When SLACK_BOT_TOKEN is empty, user IDs should pass through as-is."""
-        app.config["SLACK_BOT_TOKEN"] = ""
-        app.config["SLACK_CHANNELS"] = []
+        monkeypatch.setitem(app.config, "SLACK_BOT_TOKEN", "")
+        monkeypatch.setitem(app.config, "SLACK_CHANNELS", [])
 
         # Without token, no Slack events are fetched at all
-        with patch("app.subprocess.run",
-                   return_value=MagicMock(returncode=1, stdout="")):
-            resp = client.get("/api/activity")
-            data = resp.get_json()
-            slack_events = [e for e in data if e["type"] == "slack"]
-            assert len(slack_events) == 0
-
-    def test_handles_api_ok_false(self, app, client):
-        """Should fall back to raw ID when Slack API returns ok=false."""
-        app.config["SLACK_BOT_TOKEN"] = "xoxb-test"
-        app.config["SLACK_CHANNELS"] = ["C123"]
+        assert len(self._slack_events(client)) == 0
 
-        slack_history = self._make_slack_response([
+    def test_handles_api_ok_false(self, client, slack_api):
+        """Should fall back to raw ID when Slack API returns ok=false."""
+        slack_api["conversations.history"] = _slack_history_resp([
             {"user": "U0EEE", "text": "test", "ts": "1705312800.000"}
         ])
+        slack_api["users.info"] = FakeResponse(
+            {"ok": False, "error": "user_not_found"})
 
-        error_resp_data = json.dumps({"ok": False, "error": "user_not_found"}).encode()
-        error_resp = MagicMock()
-        error_resp.read.return_value = error_resp_data
-        error_resp.__enter__ = lambda s: s
-        error_resp.__exit__ = MagicMock(return_value=False)
-
-        def urlopen_side_effect(req, **kwargs):
-            url = req.full_url if hasattr(req, 'full_url') else req.get_full_url()
-            if "users.info" in url:
-                return error_resp
-            return slack_history
-
-        with patch("app.subprocess.run",
-                   return_value=MagicMock(returncode=1, stdout="")):
-            with patch("urllib.request.urlopen",
-                       side_effect=urlopen_side_effect):
-                resp = client.get("/api/activity")
-                data = resp.get_json()
-                slack_events = [e for e in data if e["type"] == "slack"]
-                assert slack_events[0]["agent"] == "U0EEE"
-
-    def test_bot_message_uses_bot_profile_name(self, app, client):
-        """Bot messages should show bot_profile.name when users.info fails."""
-        app.config["SLACK_BOT_TOKEN"] = "xoxb-test"
-        app.config["SLACK_CHANNELS"] = ["C123"]
+        assert self._slack_events(client)[0]["agent"] == "U0EEE"
 
-        slack_history = self._make_slack_response([
+    def test_bot_message_uses_bot_profile_name(self, client, slack_api):
+        """Bot messages should show bot_profile.name when users.info fails."""
+        slack_api["conversations.history"] = _slack_history_resp([
             {
                 "user": "U0AAA5ZK6EB",
                 "text": "hello from bot",
@@ -707,29 +990,14 @@ class TestSlackUserResolution:
             }
         ])
 
-        def urlopen_side_effect(req, **kwargs):
-            url = req.full_url if hasattr(req, 'full_url') else req.get_full_url()
-            if "users.info" in url:
-                import urllib.error
-                raise urllib.error.URLError("missing_scope")
-            return slack_history
-
-        with patch("app.subprocess.run",
-                   return_value=MagicMock(returncode=1, stdout="")):
-            with patch("urllib.request.urlopen",
-                       side_effect=urlopen_side_effect):
-                resp = client.get("/api/activity")
-                data = resp.get_json()
-                slack_events = [e for e in data if e["type"] == "slack"]
-                assert len(slack_events) == 1
-                assert slack_events[0]["agent"] == "CC-Bridge"
-
-    def test_bot_message_without_bot_profile_falls_back_to_id(self, app, client):
-        """Bot messages without bot_profile should fall back to raw user ID."""
-        app.config["SLACK_BOT_TOKEN"] = "xoxb-test"
-        app.config["SLACK_CHANNELS"] = ["C123"]
+        slack_events = self._slack_events(client)
+        assert len(slack_events) == 1
+        assert slack_events[0]["agent"] == "CC-Bridge"
 
-        slack_history = self._make_slack_response([
+    def test_bot_message_without_bot_profile_falls_back_to_id(self, client,
+                                                              slack_api):
+        """Bot messages without bot_profile should fall back to raw user ID."""
+        slack_api["conversations.history"] = _slack_history_resp([
             {
                 "user": "U0FFF",
                 "text": "orphan bot msg",
@@ -737,217 +1005,129 @@ class TestSlackUserResolution:
             }
         ])
 
-        def urlopen_side_effect(req, **kwargs):
-            url = req.full_url if hasattr(req, 'full_url') else req.get_full_url()
-            if "users.info" in url:
-                import urllib.error
-                raise urllib.error.URLError("missing_scope")
-            return slack_history
-
-        with patch("app.subprocess.run",
-                   return_value=MagicMock(returncode=1, stdout="")):
-            with patch("urllib.request.urlopen",
-                       side_effect=urlopen_side_effect):
-                resp = client.get("/api/activity")
-                data = resp.get_json()
-                slack_events = [e for e in data if e["type"] == "slack"]
-                assert slack_events[0]["agent"] == "U0FFF"
+        assert self._slack_events(client)[0]["agent"] == "U0FFF"
 
 
 # --- CC-Bridge display name inference ---
 
+@pytest.mark.slack
 class TestCCBridgeDisplayName:
     """CC-Bridge bot messages should show team member names based on channel/text."""
 
-    def _make_slack_response(self, messages):
-        slack_resp = json.dumps({"ok": True, "messages": messages}).encode()
-        mock_resp = MagicMock()
-        mock_resp.read.return_value = slack_resp
-        mock_resp.__enter__ = lambda s: s
-        mock_resp.__exit__ = MagicMock(return_value=False)
-        return mock_resp
-
-    def _get_slack_events(self, app, client, channel_id, messages):
-        """Helper: fetch activity with a CC-Bridge bot message in a given channel."""
-        app.config["SLACK_BOT_TOKEN"] = "xoxb-test"
-        app.config["SLACK_CHANNELS"] = [channel_id]
-
-        slack_history = self._make_slack_response(messages)
-
-        def urlopen_side_effect(req, **kwargs):
-            url = req.full_url if hasattr(req, 'full_url') else req.get_full_url()
-            if "users.info" in url:
-                import urllib.error
-                raise urllib.error.URLError("missing_scope")
-            return slack_history
-
-        with patch("app.subprocess.run",
-                   return_value=MagicMock(returncode=1, stdout="")):
-            with patch("urllib.request.urlopen",
-                       side_effect=urlopen_side_effect):
-                resp = client.get("/api/activity")
-                data = resp.get_json()
-                return [e for e in data if e["type"] == "slack"]
+    @pytest.fixture
+    def slack_events(self, app, client, monkeypatch, slack_api):
+        """Fetch activity with bot messages in a given channel; returns the Slack events."""
+        def _fetch(channel_id, messages):
+            monkeypatch.setitem(app.config, "SLACK_CHANNELS", [channel_id])
+            slack_api["conversations.history"] = _slack_history_resp(messages)
+            data = _json(client.get("/api/activity"))
+            return [e for e in data if e["type"] == "slack"]
+        return _fetch
+
+    _BOT_MSG = {
+        "user": "U0AAA5ZK6EB", "ts": "1705312800.000",
+        "bot_id": "B0AAN6PNC5T",
+        "bot_profile": {"name": "CC-Bridge", "id": "B0AAN6PNC5T"},
+    }
 
     def _bot_msg(self, text):
-        return {
-            "user": "U0AAA5ZK6EB", "text": text, "ts": "1705312800.000",
-            "bot_id": "B0AAN6PNC5T",
-            "bot_profile": {"name": "CC-Bridge", "id": "B0AAN6PNC5T"},
-        }
-
-    # --- Text signatures win over channel ---
-
-    def test_sam_signature_in_mat_pm_shows_sam(self, app, client):
-        """Sam posting in #mat-pm should show Sam, not Mat."""
-        events = self._get_slack_events(
-            app, client, "C0ACEGVT7CL",
-            [self._bot_msg("Sam here — frontend tests all green")]
-        )
-        assert events[0]["agent"] == "Sam"
-
-    def test_kat_signature_in_sam_dev_shows_kat(self, app, client):
-        """Kat posting in #sam-dev should show Kat, not Sam."""
-        events = self._get_slack_events(
-            app, client, "C0ABVFJPM9D",
-            [self._bot_msg("Kat: API endpoint is ready for you")]
-        )
-        assert events[0]["agent"] == "Kat"
-
-    def test_dan_via_claude_signature_shows_dan(self, app, client):
-        events = self._get_slack_events(
-            app, client, "C0AC7G6S03F",
-            [self._bot_msg("Looks good! — Dan (via Claude.ai)")]
-        )
-        assert events[0]["agent"] == "Dan"
-
-    def test_mat_emdash_signature_shows_mat(self, app, client):
-        events = self._get_slack_events(
-            app, client, "C999UNKNOWN",
-            [self._bot_msg("Sprint planning tomorrow — Mat \u2014 let me know")]
-        )
-        assert events[0]["agent"] == "Mat"
-
-    def test_sam_here_signature_shows_sam(self, app, client):
-        events = self._get_slack_events(
-            app, client, "C0AC7G548CV",
-            [self._bot_msg("Sam here, I need the new schema")]
-        )
-        assert events[0]["agent"] == "Sam"
-
-    # --- Channel fallback when no signature ---
-
-    def test_no_signature_in_mat_pm_falls_back_to_mat(self, app, client):
-        """No signature in #mat-pm should fall back to Mat."""
-        events = self._get_slack_events(
-            app, client, "C0ACEGVT7CL", [self._bot_msg("task update")]
-        )
-        assert events[0]["agent"] == "Mat"
-
-    def test_no_signature_in_kat_dev_falls_back_to_kat(self, app, client):
-        events = self._get_slack_events(
-            app, client, "C0AC7G548CV", [self._bot_msg("backend ready")]
-        )
-        assert events[0]["agent"] == "Kat"
-
-    def test_no_signature_in_sam_dev_falls_back_to_sam(self, app, client):
-        events = self._get_slack_events(
-            app, client, "C0ABVFJPM9D", [self._bot_msg("frontend done")]
-        )
-        assert events[0]["agent"] == "Sam"
-
-    # --- Fallback to CC-Bridge ---
-
-    def test_bot_unknown_channel_no_signature_shows_cc_bridge(self, app, client):
-        """CC-Bridge in unmapped channel with no signature stays CC-Bridge."""
-        events = self._get_slack_events(
-            app, client, "C999UNKNOWN",
-            [self._bot_msg("system health check passed")]
-        )
-        assert events[0]["agent"] == "CC-Bridge"
-
-    def test_non_bot_user_unaffected(self, app, client):
+        return {**self._BOT_MSG, "text": text}
+
+    @pytest.mark.parametrize("channel,text,expected", [
+        # Text signatures win over channel
+        ("C0ACEGVT7CL", "Sam here — frontend tests all green", "Sam"),
+        ("C0ABVFJPM9D", "Kat: API endpoint is ready for you", "Kat"),
+        ("C0AC7G6S03F", "Looks good! — Dan (via Claude.ai)", "Dan"),
+        ("C999UNKNOWN", "Sprint planning tomorrow — Mat \u2014 let me know", "Mat"),
+        ("C0AC7G548CV", "Sam here, I need the new schema", "Sam"),
+        # Channel fallback when no signature
+        ("C0ACEGVT7CL", "task update", "Mat"),
+        ("C0AC7G548CV", "backend ready", "Kat"),
+        ("C0ABVFJPM9D", "frontend done", "Sam"),
+        # Unmapped channel, no signature: stays CC-Bridge
+        ("C999UNKNOWN", "system health check passed", "CC-Bridge"),
+    ], ids=[
+        "sam-signature-in-mat-pm", "kat-signature-in-sam-dev",
+        "dan-via-claude-signature", "mat-emdash-signature",
+        "sam-here-signature", "no-signature-mat-pm", "no-signature-kat-dev",
+        "no-signature-sam-dev", "unknown-channel-no-signature",
+    ])
+    def test_bot_message_agent_inference(self, slack_events, channel, text,
+                                         expected):
+        events = slack_events(channel, [self._bot_msg(text)])
+        assert events[0]["agent"] == expected
+
+    def test_non_bot_user_unaffected(self, app, client, monkeypatch,
+                                     slack_api):
         """Real user messages should not be altered by inference."""
-        app.config["SLACK_BOT_TOKEN"] = "xoxb-test"
-        app.config["SLACK_CHANNELS"] = ["C0ACEGVT7CL"]
-
-        slack_history = self._make_slack_response([
+        monkeypatch.setitem(app.config, "SLACK_CHANNELS", ["C0ACEGVT7CL"])
+        slack_api["conversations.history"] = _slack_history_resp([
             {"user": "U0REALUSER", "text": "hello", "ts": "1705312800.000"}
         ])
-        user_info_data = json.dumps({
-            "ok": True,
-            "user": {"real_name": "Alice", "profile": {"display_name": "Alice"}},
-        }).encode()
-        user_info = MagicMock()
-        user_info.read.return_value = user_info_data
-        user_info.__enter__ = lambda s: s
-        user_info.__exit__ = MagicMock(return_value=False)
-
-        def urlopen_side_effect(req, **kwargs):
-            url = req.full_url if hasattr(req, 'full_url') else req.get_full_url()
-            if "users.info" in url:
-                return user_info
-            return slack_history
-
-        with patch("app.subprocess.run",
-                   return_value=MagicMock(returncode=1, stdout="")):
-            with patch("urllib.request.urlopen",
-                       side_effect=urlopen_side_effect):
-                resp = client.get("/api/activity")
-                data = resp.get_json()
-                slack_events = [e for e in data if e["type"] == "slack"]
-                assert slack_events[0]["agent"] == "Alice"
+        slack_api["users.info"] = FakeResponse(_user_info_bytes("Alice", "Alice"))
+
+        data = _json(client.get("/api/activity"))
+        slack_events = [e for e in data if e["type"] == "slack"]
+        assert slack_events[0]["agent"] == "Alice"
 
 
 # --- WORKING.md HTML rendering ---
 
 class TestWorkingHtmlRendering:
-    def _register(self, client, name="Kat"):
-        resp = client.post("/api/agents/register", json={
-            "name": name, "role": "backend", "status": "online"
+    @pytest.fixture(scope="class")
+    def agents_base(self, tmp_path_factory):
+        # One agent per document, so the read-only tests share a tree
+        return _seed_agents_base(tmp_path_factory, {
+            "kat": "## Current Task\n**Working** on issue #7\n",
+            "sam": "plain text",
         })
-        return resp.get_json()
 
-    def test_working_returns_html_content(self, app, client, tmp_path):
+    def test_working_returns_html_content(self, app, client, agents_base,
+                                          register_agent, monkeypatch):
         """Should return content_html with rendered markdown."""
-        agent = self._register(client, "Kat")
-        agent_dir = tmp_path / "kat"
-        agent_dir.mkdir()
-        (agent_dir / "WORKING.md").write_text("## Current Task\n**Working** on issue #7\n")
-        app.config["AGENTS_BASE_PATH"] = str(tmp_path)
+        agent = register_agent("Kat")
+        monkeypatch.setitem(app.config, "AGENTS_BASE_PATH", str(agents_base))
 
         resp = client.get(f"/api/agents/{agent['id']}/working")
         assert resp.status_code == 200
-        data = resp.get_json()
+        data = _json(resp)
         assert "content_html" in data
         assert "<h2>" in data["content_html"]
         assert "<strong>Working</strong>" in data["content_html"]
 
-    def test_working_still_returns_raw_content(self, app, client, tmp_path):
+    def test_working_still_returns_raw_content(self, app, client, agents_base,
+                                               register_agent, monkeypatch):
         """Should still return raw content alongside HTML."""
-        agent = self._register(client, "Kat")
-        agent_dir = tmp_path / "kat"
-        agent_dir.mkdir()
-        (agent_dir / "WORKING.md").write_text("plain text")
-        app.config["AGENTS_BASE_PATH"] = str(tmp_path)
+        agent = register_agent("Sam")
+        monkeypatch.setitem(app.config, "AGENTS_BASE_PATH", str(agents_base))
 
         resp = client.get(f"/api/agents/{agent['id']}/working")
-        data = resp.get_json()
+        data = _json(resp)
         assert data["content"] == "plain text"
         assert "content_html" in data
 
-    def test_working_renders_lists(self, app, client, tmp_path):
-        """Should render markdown lists as HTML."""
-        agent = self._register(client, "Kat")
+    def test_working_render_cached_until_file_changes(self, app, client, tmp_path,
+                                                      register_agent,
+                                                      monkeypatch):
+        """Should reuse the rendered HTML until WORKING.md is modified."""
+        agent = register_agent("Kat")
         agent_dir = tmp_path / "kat"
         agent_dir.mkdir()
-        (agent_dir / "WORKING.md").write_text("- item one\n- item two\n")
-        app.config["AGENTS_BASE_PATH"] = str(tmp_path)
+        working = agent_dir / "WORKING.md"
+        working.write_text("first")
+        monkeypatch.setitem(app.config, "AGENTS_BASE_PATH", str(tmp_path))
 
-        resp = client.get(f"/api/agents/{agent['id']}/working")
-        data = resp.get_json()
-        assert "<ul>" in data["content_html"]
-        assert "<li>" in data["content_html"]
+        with patch("app._render_markdown", wraps=_render_markdown) as md:
+            client.get(f"/api/agents/{agent['id']}/working")
+            client.get(f"/api/agents/{agent['id']}/working")
+            assert md.call_count == 1
+
+            working.write_text("second version")
+            st = working.stat()
+            os.utime(working, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+            resp = client.get(f"/api/agents/{agent['id']}/working")
+            assert md.call_count == 2
+            assert _json(resp)["content"] == "second version"
 
 
 # --- GET /api/issues ---
@@ -955,14 +1135,18 @@ class TestWorkingHtmlRendering:
 class TestIssuesEndpoint:
     """Tests for the GitHub Issues API endpoint."""
 
+    @pytest.fixture
+    def github_api(self, app, monkeypatch, _io_patches, _no_real_io):
+        """Configure a GitHub token for owner/repo; returns the patched urlopen."""
+        monkeypatch.setitem(app.config, "GITHUB_TOKEN", "test-token")
+        monkeypatch.setitem(app.config, "GITHUB_REPOS", ["owner/repo"])
+        urlopen = _io_patches[1]
+        urlopen.side_effect = None
+        return urlopen
+
     def _make_github_response(self, data):
-        """Build a mock urlopen context manager returning JSON data."""
-        resp_bytes = json.dumps(data).encode()
-        mock_resp = MagicMock()
-        mock_resp.read.return_value = resp_bytes
-        mock_resp.__enter__ = lambda s: s
-        mock_resp.__exit__ = MagicMock(return_value=False)
-        return mock_resp
+        """Build a fake urlopen response; BytesIO already has read() and with."""
+        return io.BytesIO(json.dumps(data).encode())
 
     def _sample_issue(self, number=1, title="Test issue", labels=None,
                       assignee=None, pull_request=None):
@@ -982,20 +1166,19 @@ class TestIssuesEndpoint:
             issue["pull_request"] = pull_request
         return issue
 
-    def test_issues_returns_empty_without_token(self, app, client):
+    def test_issues_returns_empty_without_token(self, app, client,
+                                                monkeypatch):
         """Should return empty list when GITHUB_TOKEN is not set."""
-        app.config["GITHUB_TOKEN"] = ""
-        app.config["GITHUB_REPOS"] = ["owner/repo"]
+        monkeypatch.setitem(app.config, "GITHUB_TOKEN", "")
+        monkeypatch.setitem(app.config, "GITHUB_REPOS", ["owner/repo"])
         # Reset cache
         resp = client.get("/api/issues")
         assert resp.status_code == 200
-        data = resp.get_json()
+        data = _json(resp)
         assert data == []
 
-    def test_issues_returns_mapped_issues(self, app, client):
+    def test_issues_returns_mapped_issues(self, client, github_api):
         """Should return issues with correct column mapping."""
-        app.config["GITHUB_TOKEN"] = "test-token"
-        app.config["GITHUB_REPOS"] = ["owner/repo"]
 
         issues_data = [
             self._sample_issue(1, "Bug fix", labels=[{"name": "in progress"}]),
@@ -1004,21 +1187,19 @@ class TestIssuesEndpoint:
         ]
         mock_resp = self._make_github_response(issues_data)
 
-        with patch("urllib.request.urlopen", return_value=mock_resp):
-            resp = client.get("/api/issues")
-            assert resp.status_code == 200
-            data = resp.get_json()
-            assert len(data) == 3
+        github_api.return_value = mock_resp
+        resp = client.get("/api/issues")
+        assert resp.status_code == 200
+        data = _json(resp)
+        assert len(data) == 3
 
-            columns = {d["title"]: d["column"] for d in data}
-            assert columns["Bug fix"] == "In Progress"
-            assert columns["New feature"] == "Assigned"
-            assert columns["Unassigned task"] == "Inbox"
+        columns = {d["title"]: d["column"] for d in data}
+        assert columns["Bug fix"] == "In Progress"
+        assert columns["New feature"] == "Assigned"
+        assert columns["Unassigned task"] == "Inbox"
 
-    def test_issues_skips_pull_requests(self, app, client):
+    def test_issues_skips_pull_requests(self, client, github_api):
         """Should filter out pull requests from results."""
-        app.config["GITHUB_TOKEN"] = "test-token"
-        app.config["GITHUB_REPOS"] = ["owner/repo"]
 
         issues_data = [
             self._sample_issue(1, "Real issue"),
@@ -1026,47 +1207,29 @@ class TestIssuesEndpoint:
         ]
         mock_resp = self._make_github_response(issues_data)
 
-        with patch("urllib.request.urlopen", return_value=mock_resp):
-            resp = client.get("/api/issues")
-            data = resp.get_json()
-            assert len(data) == 1
-            assert data[0]["title"] == "Real issue"
-
-    def test_issues_maps_review_labels(self, app, client):
-        """Should map review-related labels to Review column."""
-        app.config["GITHUB_TOKEN"] = "test-token"
-        app.config["GITHUB_REPOS"] = ["owner/repo"]
-
-        issues_data = [
-            self._sample_issue(1, "Needs review", labels=[{"name": "review"}]),
-            self._sample_issue(2, "In review", labels=[{"name": "needs review"}]),
-        ]
-        mock_resp = self._make_github_response(issues_data)
-
-        with patch("urllib.request.urlopen", return_value=mock_resp):
-            resp = client.get("/api/issues")
-            data = resp.get_json()
-            assert all(d["column"] == "Review" for d in data)
-
-    def test_issues_maps_done_labels(self, app, client):
-        """Should map done-related labels to Done column."""
-        app.config["GITHUB_TOKEN"] = "test-token"
-        app.config["GITHUB_REPOS"] = ["owner/repo"]
-
-        issues_data = [
-            self._sample_issue(1, "Completed task", labels=[{"name": "done"}]),
-        ]
-        mock_resp = self._make_github_response(issues_data)
-
-        with patch("urllib.request.urlopen", return_value=mock_resp):
-            resp = client.get("/api/issues")
-            data = resp.get_json()
-            assert data[0]["column"] == "Done"
-
-    def test_issues_includes_labels_list(self, app, client):
+        github_api.return_value = mock_resp
+        resp = client.get("/api/issues")
+        data = _json(resp)
+        assert len(data) == 1
+        assert data[0]["title"] == "Real issue"
+
+    @pytest.mark.parametrize("label,column", [
+        ("in progress", "In Progress"),
+        ("review", "Review"),
+        ("needs review", "Review"),
+        ("done", "Done"),
+        ("completed", "Done"),
+    ])
+    def test_issues_map_label_to_column(self, client, github_api, label,
+                                        column):
+        """Should map status labels to their Kanban column."""
+        github_api.return_value = self._make_github_response(
+            [self._sample_issue(1, "Labeled", labels=[{"name": label}])])
+        data = _json(client.get("/api/issues"))
+        assert data[0]["column"] == column
+
+    def test_issues_includes_labels_list(self, client, github_api):
         """Should include label objects with name and color in response."""
-        app.config["GITHUB_TOKEN"] = "test-token"
-        app.config["GITHUB_REPOS"] = ["owner/repo"]
 
         issues_data = [
             self._sample_issue(1, "Labeled", labels=[
@@ -1076,67 +1239,106 @@ class TestIssuesEndpoint:
         ]
         mock_resp = self._make_github_response(issues_data)
 
-        with patch("urllib.request.urlopen", return_value=mock_resp):
-            resp = client.get("/api/issues")
-            data = resp.get_json()
-            label_names = [l["name"] for l in data[0]["labels"]]
-            assert "bug" in label_names
-            assert "in progress" in label_names
-            assert data[0]["labels"][0]["color"] == "d73a4a"
-
-    def test_issues_includes_repo_name(self, app, client):
+        github_api.return_value = mock_resp
+        resp = client.get("/api/issues")
+        data = _json(resp)
+        label_names = [l["name"] for l in data[0]["labels"]]
+        assert "bug" in label_names
+        assert "in progress" in label_names
+        assert data[0]["labels"][0]["color"] == "d73a4a"
+
+    def test_issues_includes_repo_name(self, app, client, monkeypatch,
+                                       github_api):
         """Should include repo full name in response."""
-        app.config["GITHUB_TOKEN"] = "test-token"
-        app.config["GITHUB_REPOS"] = ["owner/myrepo"]
+        monkeypatch.setitem(app.config, "GITHUB_REPOS", ["owner/myrepo"])
 
         issues_data = [self._sample_issue(1, "Test")]
         mock_resp = self._make_github_response(issues_data)
 
-        with patch("urllib.request.urlopen", return_value=mock_resp):
-            resp = client.get("/api/issues")
-            data = resp.get_json()
-            assert data[0]["repo"] == "owner/myrepo"
+        github_api.return_value = mock_resp
+        resp = client.get("/api/issues")
+        data = _json(resp)
+        assert data[0]["repo"] == "owner/myrepo"
 
-    def test_issues_caches_results(self, app, client):
+    def test_issues_caches_results(self, app, client, monkeypatch,
+                                   github_api):
         """Should cache results and not re-fetch within TTL."""
-        app.config["GITHUB_TOKEN"] = "test-token"
-        app.config["GITHUB_REPOS"] = ["owner/repo"]
-        app.config["ISSUE_REFRESH_INTERVAL"] = 300
+        monkeypatch.setitem(app.config, "ISSUE_REFRESH_INTERVAL", 300)
 
         issues_data = [self._sample_issue(1, "Cached issue")]
         mock_resp = self._make_github_response(issues_data)
 
-        with patch("urllib.request.urlopen", return_value=mock_resp) as mock_url:
-            # First call - fetches from API
-            resp1 = client.get("/api/issues")
-            assert resp1.status_code == 200
-            call_count_1 = mock_url.call_count
+        github_api.return_value = mock_resp
+        # First call - fetches from API
+        resp1 = client.get("/api/issues")
+        assert resp1.status_code == 200
+        call_count_1 = github_api.call_count
+
+        # Second call - should use cache
+        resp2 = client.get("/api/issues")
+        assert resp2.status_code == 200
+        assert github_api.call_count == call_count_1  # no new calls
+
+        data = _json(resp2)
+        assert len(data) == 1
+        assert data[0]["title"] == "Cached issue"
+
+    def test_issues_timed_out_repo_is_not_cached(self, app, client,
+                                                 monkeypatch, github_api):
+        """Repos missing the deadline are left out and retried next time."""
+        monkeypatch.setattr("app.GITHUB_FETCH_DEADLINE", 0.05)
+        monkeypatch.setitem(app.config, "GITHUB_REPOS",
+                            ["owner/repo", "slow/repo"])
+        release = threading.Event()
+
+        def urlopen(req, timeout=None):
+            if "/slow/repo/" in req.full_url:
+                release.wait(timeout=2)
+                return self._make_github_response(
+                    [self._sample_issue(2, "Slow issue")])
+            return self._make_github_response(
+                [self._sample_issue(1, "Fast issue")])
+
+        github_api.side_effect = urlopen
+
+        data = _json(client.get("/api/issues"))
+        assert [i["title"] for i in data] == ["Fast issue"]
+        release.set()
+        data = _json(client.get("/api/issues"))
+        assert [i["title"] for i in data] == ["Fast issue", "Slow issue"]
+
+    def test_issues_handles_github_api_error(self, client, github_api):
+        """Should return empty list on GitHub API failure."""
 
-            # Second call - should use cache
-            resp2 = client.get("/api/issues")
-            assert resp2.status_code == 200
-            assert mock_url.call_count == call_count_1  # no new calls
+        github_api.side_effect = urllib.error.URLError("network error")
+        resp = client.get("/api/issues")
+        assert resp.status_code == 200
+        data = _json(resp)
+        assert data == []
 
-            data = resp2.get_json()
-            assert len(data) == 1
-            assert data[0]["title"] == "Cached issue"
+    def test_issues_from_several_repos_keep_config_order(self, app, client,
+                                                         monkeypatch,
+                                                         github_api):
+        """Repos are fetched concurrently but listed in configured order."""
+        monkeypatch.setitem(app.config, "GITHUB_REPOS",
+                            ["owner/slow", "owner/fast", "owner/down"])
 
-    def test_issues_handles_github_api_error(self, app, client):
-        """Should return empty list on GitHub API failure."""
-        app.config["GITHUB_TOKEN"] = "test-token"
-        app.config["GITHUB_REPOS"] = ["owner/repo"]
-
-        with patch("urllib.request.urlopen",
-                   side_effect=urllib.error.URLError("network error")):
-            resp = client.get("/api/issues")
-            assert resp.status_code == 200
-            data = resp.get_json()
-            assert data == []
+        def fake_urlopen(req, timeout=None):
+            if "owner/down" in req.full_url:
+                raise urllib.error.URLError("network error")
+            if "owner/slow" in req.full_url:
+                time.sleep(0.05)
+                return self._make_github_response([self._sample_issue(1, "Slow")])
+            return self._make_github_response([self._sample_issue(2, "Fast")])
+
+        github_api.side_effect = fake_urlopen
+        data = _json(client.get("/api/issues"))
+        assert [(i["repo"], i["title"]) for i in data] == [
+            ("owner/slow", "Slow"), ("owner/fast", "Fast"),
+        ]
 
-    def test_issues_response_fields(self, app, client):
+    def test_issues_response_fields(self, client, github_api):
         """Should include all expected fields in issue objects."""
-        app.config["GITHUB_TOKEN"] = "test-token"
-        app.config["GITHUB_REPOS"] = ["owner/repo"]
 
         issues_data = [
             self._sample_issue(42, "Complete issue", assignee="bob",
@@ -1144,146 +1346,128 @@ class TestIssuesEndpoint:
         ]
         mock_resp = self._make_github_response(issues_data)
 
-        with patch("urllib.request.urlopen", return_value=mock_resp):
-            resp = client.get("/api/issues")
-            data = resp.get_json()
-            issue = data[0]
-            assert issue["number"] == 42
-            assert issue["title"] == "Complete issue"
-            assert issue["assignee"] == "bob"
-            assert issue["column"] == "In Progress"
-            assert issue["repo"] == "owner/repo"
-            assert "url" in issue
-            assert "created_at" in issue
-            assert "updated_at" in issue
+        github_api.return_value = mock_resp
+        resp = client.get("/api/issues")
+        data = _json(resp)
+        issue = data[0]
+        assert issue["number"] == 42
+        assert issue["title"] == "Complete issue"
+        assert issue["assignee"] == "bob"
+        assert issue["column"] == "In Progress"
+        assert issue["repo"] == "owner/repo"
+        assert "url" in issue
+        assert "created_at" in issue
+        assert "updated_at" in issue
 
 
 # --- GET /api/dispatch/status ---
 
 class TestDispatchStatus:
-    def test_status_returns_on(self, app, client, tmp_path):
+    def test_status_returns_on(self, app, client, tmp_path, monkeypatch):
         dispatch_file = tmp_path / "dispatch-enabled.txt"
         dispatch_file.write_text("on\n")
-        app.config["DISPATCH_FILE"] = str(dispatch_file)
+        monkeypatch.setitem(app.config, "DISPATCH_FILE", str(dispatch_file))
 
         resp = client.get("/api/dispatch/status")
         assert resp.status_code == 200
-        data = resp.get_json()
+        data = _json(resp)
         assert data["status"] == "on"
 
-    def test_status_returns_off(self, app, client, tmp_path):
+    def test_status_returns_off(self, app, client, tmp_path, monkeypatch):
         dispatch_file = tmp_path / "dispatch-enabled.txt"
         dispatch_file.write_text("off\n")
-        app.config["DISPATCH_FILE"] = str(dispatch_file)
+        monkeypatch.setitem(app.config, "DISPATCH_FILE", str(dispatch_file))
 
         resp = client.get("/api/dispatch/status")
         assert resp.status_code == 200
-        data = resp.get_json()
+        data = _json(resp)
         assert data["status"] == "off"
 
-    def test_status_returns_off_when_file_missing(self, app, client, tmp_path):
-        app.config["DISPATCH_FILE"] = str(tmp_path / "nonexistent")
+    def test_status_returns_off_when_file_missing(self, app, client, tmp_path,
+                                                  monkeypatch):
+        monkeypatch.setitem(app.config, "DISPATCH_FILE",
+                            str(tmp_path / "nonexistent"))
 
         resp = client.get("/api/dispatch/status")
         assert resp.status_code == 200
-        data = resp.get_json()
+        data = _json(resp)
         assert data["status"] == "off"
 
 
 # --- POST /api/dispatch/toggle ---
 
-class TestDispatchToggle:
-    def test_toggle_flips_on_to_off(self, app, client, tmp_path):
-        dispatch_file = tmp_path / "dispatch-enabled.txt"
-        dispatch_file.write_text("on\n")
-        app.config["DISPATCH_FILE"] = str(dispatch_file)
+@pytest.fixture(scope="class")
+def dispatch_dir(tmp_path_factory):
+    """One directory per class for the toggle tests' state files."""
+    return tmp_path_factory.mktemp("dispatch")
 
-        resp = client.post("/api/dispatch/toggle",
-                           headers={"X-API-Key": "test-admin-key"})
-        assert resp.status_code == 200
-        data = resp.get_json()
-        assert data["status"] == "off"
-        assert dispatch_file.read_text().strip() == "off"
-
-    def test_toggle_flips_off_to_on(self, app, client, tmp_path):
-        dispatch_file = tmp_path / "dispatch-enabled.txt"
-        dispatch_file.write_text("off\n")
-        app.config["DISPATCH_FILE"] = str(dispatch_file)
 
-        resp = client.post("/api/dispatch/toggle",
-                           headers={"X-API-Key": "test-admin-key"})
-        assert resp.status_code == 200
-        data = resp.get_json()
-        assert data["status"] == "on"
-        assert dispatch_file.read_text().strip() == "on"
+@pytest.fixture
+def dispatch_file(app, dispatch_dir, request, monkeypatch):
+    """DISPATCH_FILE seeded with request.param ("on\n" by default).
+
+    A param of None leaves the file missing. The path is reused across a
+    class; _isolate clears the state-file cache between tests.
+    """
+    path = dispatch_dir / "dispatch-enabled.txt"
+    content = getattr(request, "param", "on\n")
+    if content is None:
+        path.unlink(missing_ok=True)
+    else:
+        path.write_text(content)
+    monkeypatch.setitem(app.config, "DISPATCH_FILE", str(path))
+    return path
 
-    def test_toggle_creates_file_when_missing(self, app, client, tmp_path):
-        dispatch_file = tmp_path / "dispatch-enabled.txt"
-        app.config["DISPATCH_FILE"] = str(dispatch_file)
 
+class TestDispatchToggle:
+    @pytest.mark.parametrize("dispatch_file,expected", [
+        ("on\n", "off"),
+        ("off\n", "on"),
+        (None, "on"),
+    ], ids=["on-to-off", "off-to-on", "creates-missing-file"],
+        indirect=["dispatch_file"])
+    def test_toggle(self, client, dispatch_file, expected):
         resp = client.post("/api/dispatch/toggle",
                            headers={"X-API-Key": "test-admin-key"})
         assert resp.status_code == 200
-        data = resp.get_json()
-        assert data["status"] == "on"
-        assert dispatch_file.read_text().strip() == "on"
-
-    def test_toggle_requires_api_key(self, app, client, tmp_path):
-        dispatch_file = tmp_path / "dispatch-enabled.txt"
-        dispatch_file.write_text("off\n")
-        app.config["DISPATCH_FILE"] = str(dispatch_file)
-        app.config["DASHBOARD_API_KEY"] = "secret-key"
-
-        resp = client.post("/api/dispatch/toggle")
-        assert resp.status_code == 403
-
-    def test_toggle_rejects_wrong_api_key(self, app, client, tmp_path):
-        dispatch_file = tmp_path / "dispatch-enabled.txt"
-        dispatch_file.write_text("off\n")
-        app.config["DISPATCH_FILE"] = str(dispatch_file)
-        app.config["DASHBOARD_API_KEY"] = "secret-key"
-
-        resp = client.post("/api/dispatch/toggle",
-                           headers={"X-API-Key": "wrong-key"})
+        data = _json(resp)
+        assert data["status"] == expected
+        assert dispatch_file.read_text().strip() == expected
+
+    @pytest.mark.parametrize("headers", [{}, {"X-API-Key": "wrong-key"}],
+                             ids=["missing-key", "wrong-key"])
+    @pytest.mark.parametrize("dispatch_file", ["off\n"], indirect=True)
+    def test_toggle_rejects_bad_api_key(self, app, client, dispatch_file,
+                                        headers, monkeypatch):
+        monkeypatch.setitem(app.config, "DASHBOARD_API_KEY", "secret-key")
+
+        resp = client.post("/api/dispatch/toggle", headers=headers)
         assert resp.status_code == 403
+        assert dispatch_file.read_text().strip() == "off"
 
 
 # --- Heartbeat toggle syncs dispatch ---
 
 class TestHeartbeatSyncsDispatch:
-    def test_heartbeat_toggle_also_updates_dispatch(self, app, client, tmp_path):
+    @pytest.mark.parametrize("dispatch_file,expected_active", [
+        ("on\n", False),
+        ("off\n", True),
+    ], ids=["on-to-off", "off-to-on"], indirect=["dispatch_file"])
+    def test_heartbeat_toggle_also_updates_dispatch(self, app, client,
+                                                    dispatch_dir,
+                                                    dispatch_file,
+                                                    expected_active,
+                                                    monkeypatch):
         """Toggling heartbeat should also update dispatch-enabled.txt."""
-        hb_file = tmp_path / ".heartbeat-active"
-        hb_file.write_text("on\n")
-        app.config["HEARTBEAT_FILE"] = str(hb_file)
-
-        dispatch_file = tmp_path / "dispatch-enabled.txt"
-        dispatch_file.write_text("on\n")
-        app.config["DISPATCH_FILE"] = str(dispatch_file)
-
-        resp = client.post("/api/heartbeat/toggle",
-                           headers={"X-API-Key": "test-admin-key"})
-        assert resp.status_code == 200
-        data = resp.get_json()
-        assert data["active"] is False
-
-        # Dispatch file should also be "off"
-        assert dispatch_file.read_text().strip() == "off"
-
-    def test_heartbeat_toggle_on_also_enables_dispatch(self, app, client, tmp_path):
-        """Toggling heartbeat on should also enable dispatch."""
-        hb_file = tmp_path / ".heartbeat-active"
-        hb_file.write_text("off\n")
-        app.config["HEARTBEAT_FILE"] = str(hb_file)
-
-        dispatch_file = tmp_path / "dispatch-enabled.txt"
-        dispatch_file.write_text("off\n")
-        app.config["DISPATCH_FILE"] = str(dispatch_file)
+        hb_file = dispatch_dir / ".heartbeat-active"
+        hb_file.write_text(dispatch_file.read_text())
+        monkeypatch.setitem(app.config, "HEARTBEAT_FILE", str(hb_file))
 
         resp = client.post("/api/heartbeat/toggle",
                            headers={"X-API-Key": "test-admin-key"})
         assert resp.status_code == 200
-        data = resp.get_json()
-        assert data["active"] is True
+        data = _json(resp)
+        assert data["active"] is expected_active
 
-        assert dispatch_file.read_text().strip() == "on"
+        expected = "on" if expected_active else "off"
+        assert dispatch_file.read_text().strip() == expected
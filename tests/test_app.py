@@ -1,17 +1,4 @@
-import pytest
-from app import create_app
-
-
-@pytest.fixture
-def app(tmp_path):
-    db_path = str(tmp_path / "test.db")
-    app = create_app(testing=True, db_path_override=db_path)
-    yield app
-
-
-@pytest.fixture
-def client(app):
-    return app.test_client()
+from app import create_app, OrjsonProvider, _render_markdown
 
 
 def test_app_exists(app):
@@ -22,6 +9,47 @@ def test_app_is_testing(app):
     assert app.config["TESTING"] is True
 
 
+def test_templates_do_not_auto_reload(app):
+    assert app.config["TEMPLATES_AUTO_RELOAD"] is False
+    assert app.jinja_env.auto_reload is False
+
+
 def test_index_returns_200(client):
     response = client.get("/")
     assert response.status_code == 200
+
+
+def test_configured_paths_are_expanded(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setattr("config.TestConfig.HEARTBEAT_FILE", "~/hb")
+    app = create_app(testing=True, db_path_override=str(tmp_path / "t.db"))
+    try:
+        assert app.config["HEARTBEAT_FILE"] == str(tmp_path / "hb")
+    finally:
+        app.extensions["db_pool"].close()
+
+
+def test_json_provider_is_orjson(app):
+    assert isinstance(app.json, OrjsonProvider)
+    with app.test_request_context():
+        resp = app.json.response({"ok": True})
+    assert resp.get_data() == b'{"ok":true}'
+
+
+def test_json_provider_accepts_non_str_keys(app):
+    with app.test_request_context():
+        resp = app.json.response({1: 2})
+    assert resp.get_data() == b'{"1":2}'
+    assert app.json.dumps({1: 2}) == '{"1":2}'
+
+
+def test_render_markdown_lists():
+    html = _render_markdown("- item one\n- item two\n")
+    assert "<ul>" in html
+    assert "<li>" in html
+
+
+def test_render_markdown_documents_are_independent():
+    """The shared converter must not leak state between documents."""
+    _render_markdown("Ref [link][x]\n\n[x]: http://kat")
+    assert "http://kat" not in _render_markdown("Ref [link][x]")
@@ -1,15 +1,18 @@
 import sqlite3
+import threading
 import pytest
 from datetime import datetime, timezone, timedelta
 from models import (
     init_db, get_db_connection, create_agent, get_all_agents, get_agent,
-    update_heartbeat, check_heartbeat_timeouts,
+    update_heartbeat, check_heartbeat_timeouts, ConnectionPool,
+    get_cached_slack_user, cache_slack_user, cache_slack_users,
+    create_agents_bulk, PoolTimeoutError,
 )
 
 
-@pytest.fixture
-def db():
-    """Create an in-memory database for testing."""
+@pytest.fixture(scope="module")
+def _conn():
+    """One in-memory database, with its schema, for the whole module."""
     conn = sqlite3.connect(":memory:")
     conn.row_factory = sqlite3.Row
     init_db(conn)
@@ -17,6 +20,18 @@ def db():
     conn.close()
 
 
+@pytest.fixture
+def db(_conn):
+    """The module's database, emptied again after each test."""
+    yield _conn
+    if _conn.in_transaction:
+        _conn.rollback()
+    _conn.execute("DELETE FROM agents")
+    _conn.execute("DELETE FROM slack_users")
+    _conn.execute("DELETE FROM sqlite_sequence")
+    _conn.commit()
+
+
 def test_init_db_creates_agents_table(db):
     cursor = db.execute(
         "SELECT name FROM sqlite_master WHERE type='table' AND name='agents'"
@@ -40,6 +55,14 @@ def test_create_duplicate_agent_updates(db):
     assert len(agents) == 1
 
 
+def test_create_duplicate_agent_keeps_id_and_created_at(db):
+    first = create_agent(db, "test-agent", role="backend", status="online")
+    second = create_agent(db, "test-agent", role="frontend", status="idle")
+    assert second["id"] == first["id"]
+    assert second["created_at"] == first["created_at"]
+    assert second["role"] == "frontend"
+
+
 def test_get_all_agents(db):
     create_agent(db, "agent-1", status="online")
     create_agent(db, "agent-2", status="idle")
@@ -77,6 +100,14 @@ def test_update_heartbeat_with_current_task(db):
     assert updated["current_task"] == "fixing bug #42"
 
 
+def test_update_heartbeat_keeps_fields_when_omitted(db):
+    agent = create_agent(db, "test-agent", status="busy")
+    update_heartbeat(db, agent["id"], current_task="triage")
+    updated = update_heartbeat(db, agent["id"])
+    assert updated["status"] == "busy"
+    assert updated["current_task"] == "triage"
+
+
 def test_update_heartbeat_nonexistent(db):
     result = update_heartbeat(db, 9999)
     assert result is None
@@ -107,3 +138,165 @@ def test_check_heartbeat_timeouts_skips_already_offline(db):
     check_heartbeat_timeouts(db, timeout_seconds=60)
     updated = get_agent(db, agent["id"])
     assert updated["status"] == "offline"
+
+
+def test_pool_reuses_returned_connection(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "pool.db"), size=2)
+    with pool.borrow() as first:
+        init_db(first)
+    with pool.borrow() as second:
+        assert second is first
+    pool.close()
+
+
+def test_pool_opens_up_to_size(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "pool.db"), size=2)
+    a = pool.get()
+    b = pool.get()
+    assert a is not b
+    pool.put(a)
+    pool.put(b)
+    pool.close()
+
+
+def test_pool_get_times_out_when_exhausted(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "pool.db"), size=1, timeout=0.01)
+    held = pool.get()
+    with pytest.raises(PoolTimeoutError, match="checked out"):
+        pool.get()
+    pool.put(held)
+    assert pool.get() is held
+    pool.put(held)
+    pool.close()
+
+
+def test_pool_concurrent_borrowers_stay_within_size(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "pool.db"), size=2)
+    with pool.borrow() as conn:
+        init_db(conn)
+    start = threading.Barrier(8)
+    seen = set()
+    errors = []
+
+    def worker():
+        start.wait()
+        try:
+            for _ in range(50):
+                with pool.borrow() as conn:
+                    seen.add(id(conn))
+                    conn.execute("SELECT COUNT(*) FROM agents").fetchone()
+        except PoolTimeoutError as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    assert pool._created <= pool.size
+    assert len(seen) <= pool.size
+    pool.close()
+
+
+def test_pool_clamps_memory_db_to_one_connection():
+    pool = ConnectionPool(":memory:", size=5)
+    assert pool.size == 1
+    with pool.borrow() as conn:
+        init_db(conn)
+    with pool.borrow() as conn:
+        assert get_all_agents(conn) == []
+    pool.close()
+
+
+def test_get_db_connection_enables_wal(tmp_path):
+    conn = get_db_connection(str(tmp_path / "wal.db"))
+    mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+    sync = conn.execute("PRAGMA synchronous").fetchone()[0]
+    limit = conn.execute("PRAGMA journal_size_limit").fetchone()[0]
+    conn.close()
+    assert mode == "wal"
+    assert sync == 1  # NORMAL
+    assert limit == 67108864
+
+
+def test_get_db_connection_skips_wal_for_memory():
+    conn = get_db_connection(":memory:")
+    mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+    conn.close()
+    assert mode == "memory"
+
+
+def test_cache_slack_user_roundtrip(db):
+    cache_slack_user(db, "U0AAA", "Alice", ttl_seconds=60)
+    assert get_cached_slack_user(db, "U0AAA") == "Alice"
+
+
+def test_cached_slack_user_missing_returns_none(db):
+    assert get_cached_slack_user(db, "U0NOPE") is None
+
+
+def test_cached_slack_user_expires(db):
+    cache_slack_user(db, "U0AAA", "Alice", ttl_seconds=-1)
+    assert get_cached_slack_user(db, "U0AAA") is None
+
+
+def test_cache_slack_users_bulk(db):
+    cache_slack_users(db, [("U0AAA", "Alice"), ("U0BBB", "Bob")], ttl_seconds=60)
+    assert get_cached_slack_user(db, "U0AAA") == "Alice"
+    assert get_cached_slack_user(db, "U0BBB") == "Bob"
+
+
+def test_cache_slack_users_is_atomic(tmp_path):
+    conn = get_db_connection(str(tmp_path / "users.db"), isolation_level=None)
+    init_db(conn)
+    with pytest.raises(sqlite3.IntegrityError):
+        cache_slack_users(conn, [("U0AAA", "Alice"), ("U0BBB", None)],
+                          ttl_seconds=60)
+    assert not conn.in_transaction
+    assert get_cached_slack_user(conn, "U0AAA") is None
+    cache_slack_users(conn, [("U0AAA", "Alice")], ttl_seconds=60)
+    assert get_cached_slack_user(conn, "U0AAA") == "Alice"
+    conn.close()
+
+
+def test_init_db_indexes_status_last_active(db):
+    indexes = [row["name"] for row in db.execute("PRAGMA index_list(agents)")]
+    assert "idx_agents_status_last_active" in indexes
+
+
+def test_create_agents_bulk_inserts_and_updates(db):
+    create_agent(db, "Kat", role="backend", status="offline")
+    written = create_agents_bulk(db, [
+        ("Kat", "frontend", "online"),
+        ("Sam", "qa", "idle"),
+    ])
+    assert written == 2
+    agents = {a["name"]: a for a in get_all_agents(db)}
+    assert agents["Kat"]["role"] == "frontend"
+    assert agents["Kat"]["status"] == "online"
+    assert agents["Sam"]["status"] == "idle"
+
+
+def test_create_agents_bulk_is_atomic(tmp_path):
+    conn = get_db_connection(str(tmp_path / "bulk.db"), isolation_level=None)
+    init_db(conn)
+    with pytest.raises(sqlite3.IntegrityError):
+        create_agents_bulk(conn, [("Kat", "backend", "online"),
+                                  ("Sam", None, "online")])
+    assert get_all_agents(conn) == []
+    conn.close()
+
+
+def test_pool_shares_memory_uri_database():
+    uri = "file:pooltest?mode=memory&cache=shared"
+    pool = ConnectionPool(uri, size=2)
+    assert pool.size == 2
+    first = pool.get()
+    init_db(first)
+    create_agent(first, "Kat")
+    second = pool.get()
+    assert [a["name"] for a in get_all_agents(second)] == ["Kat"]
+    pool.put(first)
+    pool.put(second)
+    pool.close()
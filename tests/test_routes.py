@@ -1,253 +1,180 @@
 import pytest
-from app import create_app
 
 
-@pytest.fixture
-def client(tmp_path):
-    db_path = str(tmp_path / "test.db")
-    app = create_app(testing=True, db_path_override=db_path)
-    return app.test_client()
-
-
-def test_dashboard_route(client):
-    response = client.get("/")
+@pytest.mark.parametrize("path,needle", [
+    ("/", b"Dashboard"),
+    ("/agents", b"Agents"),
+    ("/issues", b"Issues"),
+])
+def test_page_route(client, path, needle):
+    response = client.get(path)
     assert response.status_code == 200
-    assert b"Dashboard" in response.data
-
-
-def test_agents_route(client):
-    response = client.get("/agents")
-    assert response.status_code == 200
-    assert b"Agents" in response.data
-
-
-def test_issues_route(client):
-    response = client.get("/issues")
-    assert response.status_code == 200
-    assert b"Issues" in response.data
-
-
-def test_issues_page_has_kanban_board(client):
-    response = client.get("/issues")
-    html = response.data.decode()
-    assert 'id="kanban-board"' in html
-
-
-def test_issues_page_has_kanban_columns(client):
-    response = client.get("/issues")
-    html = response.data.decode()
-    assert 'data-column="Inbox"' in html
-    assert 'data-column="Assigned"' in html
-    assert 'data-column="In Progress"' in html
-    assert 'data-column="Review"' in html
-    assert 'data-column="Done"' in html
-
-
-def test_issues_page_has_view_toggle(client):
-    response = client.get("/issues")
-    html = response.data.decode()
-    assert 'id="kanban-view-btn"' in html
-    assert 'id="list-view-btn"' in html
-
-
-def test_issues_page_has_list_view(client):
-    response = client.get("/issues")
-    html = response.data.decode()
-    assert 'id="issues-list"' in html
-    assert 'id="issues-table"' in html
-
-
-def test_issues_page_has_count_badges(client):
-    response = client.get("/issues")
-    html = response.data.decode()
-    assert 'id="count-inbox"' in html
-    assert 'id="count-assigned"' in html
-    assert 'id="count-in-progress"' in html
-    assert 'id="count-review"' in html
-    assert 'id="count-done"' in html
-
-
-def test_nav_has_issues_badge(client):
-    response = client.get("/")
-    html = response.data.decode()
-    assert 'id="issues-badge"' in html
-
-
-def test_nav_links_present_on_dashboard(client):
-    response = client.get("/")
-    html = response.data.decode()
-    assert 'href="/"' in html
-    assert 'href="/agents"' in html
-    assert 'href="/issues"' in html
-
-
-def test_dark_theme_css_loaded(client):
-    response = client.get("/")
-    html = response.data.decode()
-    assert "style.css" in html
-
-
-# --- Milestone 2: Agent Status Panel frontend tests ---
+    assert needle in response.data
+
+
+@pytest.fixture(scope="module")
+def dashboard_html(client):
+    return client.get("/").get_data(as_text=True)
+
+
+@pytest.fixture(scope="module")
+def agents_html(client):
+    return client.get("/agents").get_data(as_text=True)
+
+
+@pytest.fixture(scope="module")
+def issues_html(client):
+    return client.get("/issues").get_data(as_text=True)
+
+
+@pytest.mark.parametrize("needle", [
+    # Nav and assets
+    'id="issues-badge"',
+    'href="/"',
+    'href="/agents"',
+    'href="/issues"',
+    "style.css",
+    "dashboard.js",
+    # --- Milestone 2: Agent Status Panel ---
+    'id="agent-cards"',
+    'id="dashboard-status-filter"',
+    'data-filter="all"',
+    'data-filter="online"',
+    'data-filter="busy"',
+    'data-filter="offline"',
+    "Agent Status",
+    "agent-summary",
+    "Loading agents...",
+])
+def test_dashboard_contains(dashboard_html, needle):
+    assert needle in dashboard_html
+
+
+@pytest.mark.parametrize("needle", [
+    'id="agent-table"',
+    'id="agent-table-body"',
+    # Table columns
+    "Name", "Role", "Status", "Current Task", "Last Active", "Uptime",
+    'id="agents-status-filter"',
+    'data-filter="all"',
+    'data-filter="online"',
+    'data-filter="error"',
+    "Loading agents...",
+    # Wrapped for mobile
+    "table-wrap",
+    # --- Terminal live view section ---
+    'id="terminal-section"',
+    "Live Terminal Output",
+    'id="terminal-grid"',
+])
+def test_agents_page_contains(agents_html, needle):
+    assert needle in agents_html
+
+
+@pytest.mark.parametrize("needle", [
+    'id="kanban-board"',
+    # Kanban columns
+    'data-column="Inbox"',
+    'data-column="Assigned"',
+    'data-column="In Progress"',
+    'data-column="Review"',
+    'data-column="Done"',
+    # View toggle
+    'id="kanban-view-btn"',
+    'id="list-view-btn"',
+    # List view
+    'id="issues-list"',
+    'id="issues-table"',
+    # Count badges
+    'id="count-inbox"',
+    'id="count-assigned"',
+    'id="count-in-progress"',
+    'id="count-review"',
+    'id="count-done"',
+])
+def test_issues_page_contains(issues_html, needle):
+    assert needle in issues_html
 
 
-def test_dashboard_has_agent_cards_container(client):
-    response = client.get("/")
-    html = response.data.decode()
-    assert 'id="agent-cards"' in html
-
-
-def test_dashboard_has_status_filter(client):
-    response = client.get("/")
-    html = response.data.decode()
-    assert 'id="dashboard-status-filter"' in html
-    assert 'data-filter="all"' in html
-    assert 'data-filter="online"' in html
-    assert 'data-filter="busy"' in html
-    assert 'data-filter="offline"' in html
-
-
-def test_dashboard_has_agent_summary_section(client):
-    response = client.get("/")
-    html = response.data.decode()
-    assert "Agent Status" in html
-    assert "agent-summary" in html
-
-
-def test_agents_page_has_table(client):
-    response = client.get("/agents")
-    html = response.data.decode()
-    assert 'id="agent-table"' in html
-    assert 'id="agent-table-body"' in html
-
-
-def test_agents_table_has_correct_columns(client):
-    response = client.get("/agents")
-    html = response.data.decode()
-    for col in ["Name", "Role", "Status", "Current Task", "Last Active", "Uptime"]:
-        assert col in html
-
-
-def test_agents_page_has_status_filter(client):
-    response = client.get("/agents")
-    html = response.data.decode()
-    assert 'id="agents-status-filter"' in html
-    assert 'data-filter="all"' in html
-    assert 'data-filter="online"' in html
-    assert 'data-filter="error"' in html
-
-
-def test_agents_page_has_loading_message(client):
-    response = client.get("/agents")
-    html = response.data.decode()
-    assert "Loading agents..." in html
-
-
-def test_dashboard_js_loaded(client):
-    response = client.get("/")
-    html = response.data.decode()
-    assert "dashboard.js" in html
-
-
-def test_dashboard_loading_message(client):
-    response = client.get("/")
-    html = response.data.decode()
-    assert "Loading agents..." in html
-
-
-def test_agents_table_wrapped_for_mobile(client):
-    response = client.get("/agents")
-    html = response.data.decode()
-    assert "table-wrap" in html
-
-
-# --- Terminal live view section ---
-
-
-def test_agents_page_has_terminal_section(client):
-    response = client.get("/agents")
-    html = response.data.decode()
-    assert 'id="terminal-section"' in html
-    assert "Live Terminal Output" in html
+# --- WORKING.md display in agent cards ---
 
 
-def test_agents_page_has_terminal_grid(client):
-    response = client.get("/agents")
-    html = response.data.decode()
-    assert 'id="terminal-grid"' in html
+@pytest.fixture(scope="module")
+def dashboard_js(client):
+    return client.get("/static/js/dashboard.js").get_data(as_text=True)
 
 
-# --- WORKING.md display in agent cards ---
+@pytest.fixture(scope="module")
+def style_css(client):
+    return client.get("/static/css/style.css").get_data(as_text=True)
 
 
-def test_dashboard_js_has_working_md_fetch(client):
+def test_dashboard_js_has_working_md_fetch(dashboard_js):
     """dashboard.js should contain the fetchWorkingMd function."""
-    response = client.get("/static/js/dashboard.js")
-    js = response.data.decode()
-    assert "fetchWorkingMd" in js
-    assert "/working" in js
+    assert "fetchWorkingMd" in dashboard_js
+    assert "/working" in dashboard_js
 
 
-def test_css_has_working_styles(client):
+def test_css_has_working_styles(style_css):
     """style.css should include working display styles."""
-    response = client.get("/static/css/style.css")
-    css = response.data.decode()
-    assert ".agent-working" in css
-    assert ".agent-working-label" in css
+    assert ".agent-working" in style_css
+    assert ".agent-working-label" in style_css
 
 
-def test_dashboard_js_renders_working_container(client):
+def test_dashboard_js_renders_working_container(dashboard_js):
     """dashboard.js should render working-<id> containers in agent cards."""
-    response = client.get("/static/js/dashboard.js")
-    js = response.data.decode()
-    assert "working-" in js
-    assert "agent-working" in js
+    assert "working-" in dashboard_js
+    assert "agent-working" in dashboard_js
 
 
-def test_dashboard_js_uses_content_html(client):
+def test_dashboard_js_uses_content_html(dashboard_js):
     """dashboard.js should use content_html for rendered markdown."""
-    response = client.get("/static/js/dashboard.js")
-    js = response.data.decode()
-    assert "content_html" in js
-    assert "working-md-rendered" in js
+    assert "content_html" in dashboard_js
+    assert "working-md-rendered" in dashboard_js
+
+
+def test_dashboard_js_subscribes_to_activity_stream(dashboard_js):
+    """dashboard.js should use EventSource for activity with a polling fallback."""
+    assert "EventSource" in dashboard_js
+    assert "/api/activity/stream" in dashboard_js
+    assert "ACTIVITY_REFRESH_INTERVAL" in dashboard_js
 
 
-def test_css_has_rendered_markdown_styles(client):
+def test_css_has_rendered_markdown_styles(style_css):
     """style.css should include styles for rendered markdown."""
-    response = client.get("/static/css/style.css")
-    css = response.data.decode()
-    assert ".working-md-rendered" in css
-    assert ".working-md-rendered h2" in css
-    assert ".working-md-rendered strong" in css
+    assert ".working-md-rendered" in style_css
+    assert ".working-md-rendered h2" in style_css
+    assert ".working-md-rendered strong" in style_css
 
 
 class TestHeartbeatToggleUI:
     def test_dashboard_shows_frozen_toggle_by_default(self, client):
         """Default dashboard should show frozen toggle slider, badge, and lock icon."""
         resp = client.get("/")
-        html = resp.data.decode()
-        assert 'id="heartbeat-badge"' in html
-        assert 'id="toggle-btn"' not in html
+        html = resp.data
+        assert b'id="heartbeat-badge"' in html
+        assert b'id="toggle-btn"' not in html
         # Frozen toggle display and lock icon for non-admin
-        assert 'id="toggle-display"' in html
-        assert 'toggle-frozen' in html
-        assert 'hb-lock' in html
+        assert b'id="toggle-display"' in html
+        assert b'toggle-frozen' in html
+        assert b'hb-lock' in html
 
     def test_dashboard_shows_toggle_with_admin_param(self, client):
         """Dashboard with correct admin param should include interactive toggle."""
         resp = client.get("/?admin=test-admin-key")
-        html = resp.data.decode()
-        assert 'data-admin-mode="true"' in html
-        assert 'id="toggle-btn"' in html
-        assert 'id="heartbeat-badge"' in html
+        html = resp.data
+        assert b'data-admin-mode="true"' in html
+        assert b'id="toggle-btn"' in html
+        assert b'id="heartbeat-badge"' in html
         # No frozen toggle or lock icon for admin
-        assert 'id="toggle-display"' not in html
-        assert 'hb-lock' not in html
+        assert b'id="toggle-display"' not in html
+        assert b'hb-lock' not in html
 
     def test_dashboard_no_toggle_with_wrong_admin_param(self, client):
         """Dashboard with wrong admin param should show frozen toggle, not interactive."""
         resp = client.get("/?admin=wrong-key")
-        html = resp.data.decode()
-        assert 'data-admin-mode' not in html
-        assert 'id="toggle-btn"' not in html
-        assert 'id="toggle-display"' in html
-        assert 'hb-lock' in html
+        html = resp.data
+        assert b'data-admin-mode' not in html
+        assert b'id="toggle-btn"' not in html
+        assert b'id="toggle-display"' in html
+        assert b'hb-lock' in html